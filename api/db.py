@@ -1,6 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from pymongo import AsyncMongoClient
 from settings import settings
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 import redis.asyncio as aioredis
 from qstash import AsyncQStash
@@ -8,13 +11,37 @@ from qstash import AsyncQStash
 client = AsyncMongoClient(settings.mongo_uri)
 db = client.moick_db
 
+_transactions_supported: Optional[bool] = None
+
+
+async def transactions_supported() -> bool:
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
 
 s3 = boto3.client(
     "s3",
     endpoint_url=settings.storage_endpoint_url,
     aws_access_key_id=settings.storage_access_key,
     aws_secret_access_key=settings.storage_secret_key,
-    config=Config(signature_version="s3v4"),
+    config=Config(
+        signature_version="s3v4",
+        max_pool_connections=settings.storage_max_workers
+        * settings.storage_multipart_concurrency,
+    ),
+)
+
+s3_executor = ThreadPoolExecutor(
+    max_workers=settings.storage_max_workers, thread_name_prefix="storage"
+)
+
+s3_transfer_config = TransferConfig(
+    multipart_threshold=settings.storage_multipart_chunk_size,
+    multipart_chunksize=settings.storage_multipart_chunk_size,
+    max_concurrency=settings.storage_multipart_concurrency,
 )
 
 redis = aioredis.from_url(url=settings.redis_url, decode_responses=True)
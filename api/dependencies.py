@@ -5,6 +5,8 @@ from typing import Annotated
 from modules.projects.services import ProjectService
 from modules.statements.services import StatementService
 from modules.files.services import FileService
+from modules.metrics.services import MetricsService
+from modules.jobs.queue import job_queue
 
 
 api_key_header = APIKeyHeader(name="X-Api-Key", auto_error=False)
@@ -45,6 +47,8 @@ class Services:
         self.projects = ProjectService()
         self.statements = StatementService()
         self.files = FileService()
+        self.metrics = MetricsService()
+        self.jobs = job_queue
 
 
 def get_services() -> "Services":
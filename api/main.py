@@ -1,10 +1,19 @@
+import asyncio
 from contextlib import asynccontextmanager
 from beanie import init_beanie
 from fastapi import FastAPI
 from routers import router
 from db import db
+from modules.projects.deletion import resume_project_deletions
 from modules.projects.models import Project
 from modules.statements.models import Statement, Transaction
+from modules.statements.events import status_broadcaster
+from modules.statements.migrations import (
+    backfill_search_tokens,
+    backfill_tenant_keys,
+    migrate_embedding_storage,
+)
+from settings import settings
 from fastapi.middleware.cors import CORSMiddleware
 
 
@@ -20,9 +29,22 @@ async def lifespan(app: FastAPI):
         await db.command("ping")
     except Exception as e:
         raise e
+    deletions = asyncio.create_task(resume_project_deletions())
+    migrations = []
+    if settings.run_migrations_on_startup:
+        await backfill_tenant_keys()
+        migrations = [
+            asyncio.create_task(backfill_search_tokens()),
+            asyncio.create_task(migrate_embedding_storage()),
+        ]
 
     yield
 
+    deletions.cancel()
+    for migration in migrations:
+        migration.cancel()
+    await status_broadcaster.close()
+
 
 app = FastAPI(lifespan=lifespan, title="Moick API")
 
@@ -0,0 +1,2 @@
+class FileDeleteException(Exception):
+    pass
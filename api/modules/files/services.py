@@ -1,24 +1,124 @@
+import asyncio
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
 from fastapi import UploadFile
-from db import s3
+from db import s3, s3_executor, s3_transfer_config
 from settings import settings
+from modules.files.exceptions import FileDeleteException
+
+T = TypeVar("T")
 
 
 class FileService:
+    def _file_path(
+        self, organization_id: str, project_id: str, statement_id: str
+    ) -> str:
+        return f"{self._project_prefix(organization_id, project_id)}{statement_id}"
+
+    def _project_prefix(self, organization_id: str, project_id: str) -> str:
+        return f"{organization_id}/{project_id}/"
+
+    async def _run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(s3_executor, partial(func, *args, **kwargs))
+
     async def upload_file(
         self, file: UploadFile, organization_id: str, project_id: str, statement_id: str
     ) -> None:
-        file_path = f"{organization_id}/{project_id}/{statement_id}"
-        s3.upload_fileobj(file.file, settings.bucket_name, file_path)
+        file_path = self._file_path(organization_id, project_id, statement_id)
+        await self._run(
+            s3.upload_fileobj,
+            file.file,
+            settings.bucket_name,
+            file_path,
+            Config=s3_transfer_config,
+        )
+
+    async def upload_files(
+        self,
+        files: List[tuple[UploadFile, str]],
+        organization_id: str,
+        project_id: str,
+    ) -> List[Optional[BaseException]]:
+        semaphore = asyncio.Semaphore(settings.storage_upload_concurrency)
+
+        async def upload(file: UploadFile, statement_id: str) -> None:
+            async with semaphore:
+                await self.upload_file(
+                    file=file,
+                    organization_id=organization_id,
+                    project_id=project_id,
+                    statement_id=statement_id,
+                )
+
+        results = await asyncio.gather(
+            *(upload(file, statement_id) for file, statement_id in files),
+            return_exceptions=True,
+        )
+        return [
+            result if isinstance(result, BaseException) else None for result in results
+        ]
+
+    async def stream_file(
+        self, organization_id: str, project_id: str, statement_id: str
+    ) -> AsyncIterator[bytes]:
+        file_path = self._file_path(organization_id, project_id, statement_id)
+        object = await self._run(
+            s3.get_object, Bucket=settings.bucket_name, Key=file_path
+        )
+        body = object["Body"]
+        try:
+            while chunk := await self._run(
+                body.read, settings.storage_download_chunk_size
+            ):
+                yield chunk
+        finally:
+            body.close()
 
     async def get_file(
         self, organization_id: str, project_id: str, statement_id: str
     ) -> bytes:
-        file_path = f"{organization_id}/{project_id}/{statement_id}"
-        object = s3.get_object(Bucket=settings.bucket_name, Key=file_path)
-        return object["Body"].read()
+        content = bytearray()
+        async for chunk in self.stream_file(
+            organization_id=organization_id,
+            project_id=project_id,
+            statement_id=statement_id,
+        ):
+            content.extend(chunk)
+        return bytes(content)
 
     async def delete_file(
         self, organization_id: str, project_id: str, statement_id: str
     ) -> None:
-        file_path = f"{organization_id}/{project_id}/{statement_id}"
-        s3.delete_object(Bucket=settings.bucket_name, Key=file_path)
+        file_path = self._file_path(organization_id, project_id, statement_id)
+        await self._run(s3.delete_object, Bucket=settings.bucket_name, Key=file_path)
+
+    async def delete_project_files(
+        self,
+        organization_id: str,
+        project_id: str,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> int:
+        prefix = self._project_prefix(organization_id, project_id)
+        deleted = 0
+        while True:
+            listing = await self._run(
+                s3.list_objects_v2,
+                Bucket=settings.bucket_name,
+                Prefix=prefix,
+                MaxKeys=settings.storage_delete_batch_size,
+            )
+            keys = [{"Key": item["Key"]} for item in listing.get("Contents", [])]
+            if not keys:
+                return deleted
+            response = await self._run(
+                s3.delete_objects,
+                Bucket=settings.bucket_name,
+                Delete={"Objects": keys, "Quiet": True},
+            )
+            if response.get("Errors"):
+                error = response["Errors"][0]
+                raise FileDeleteException(f"{error['Key']}: {error['Message']}")
+            deleted += len(keys)
+            if on_progress is not None:
+                await on_progress(len(keys))
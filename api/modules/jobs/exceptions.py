@@ -0,0 +1,4 @@
+class JobDeferredException(Exception):
+    def __init__(self, delay: float) -> None:
+        super().__init__(f"Deferred for {delay:.1f}s")
+        self.delay = delay
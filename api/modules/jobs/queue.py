@@ -0,0 +1,341 @@
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from db import redis
+from settings import settings
+from modules.jobs.enums import JobPriority
+from modules.jobs.schemas import Job, JobQueueDepth
+
+
+SCHEDULING = """
+local prefix = ARGV[1]
+
+local function activate(priority, tenant)
+    local tenants = prefix .. ':tenants:' .. priority
+    if redis.call('ZSCORE', tenants, tenant) then
+        return
+    end
+    local finish = redis.call('HGET', prefix .. ':finish:' .. priority, tenant)
+    local clock = redis.call('GET', prefix .. ':clock:' .. priority)
+    local start = math.max(tonumber(finish or '0'), tonumber(clock or '0'))
+    redis.call('ZADD', tenants, start, tenant)
+end
+
+local function push(id, front)
+    local job = prefix .. ':job:' .. id
+    local priority = redis.call('HGET', job, 'priority')
+    local tenant = redis.call('HGET', job, 'tenant')
+    if not priority or not tenant then
+        return
+    end
+    local ready = prefix .. ':ready:' .. priority .. ':' .. tenant
+    if front then
+        redis.call('RPUSH', ready, id)
+    else
+        redis.call('LPUSH', ready, id)
+    end
+    activate(priority, tenant)
+end
+"""
+
+ENQUEUE_SCRIPT = (
+    SCHEDULING
+    + """
+for index = 2, #ARGV do
+    push(ARGV[index], false)
+end
+return #ARGV - 1
+"""
+)
+
+RESERVE_SCRIPT = (
+    SCHEDULING
+    + """
+local now, deadline, token = ARGV[2], ARGV[3], ARGV[4]
+local delayed = prefix .. ':delayed'
+local processing = prefix .. ':processing'
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', delayed, '-inf', now, 'LIMIT', 0, 100)) do
+    redis.call('ZREM', delayed, id)
+    push(id, false)
+end
+local max_attempts = tonumber(ARGV[6])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', processing, '-inf', now, 'LIMIT', 0, 100)) do
+    redis.call('ZREM', processing, id)
+    local job = prefix .. ':job:' .. id
+    if tonumber(redis.call('HGET', job, 'attempts') or '0') >= max_attempts then
+        redis.call('HSET', job, 'error', 'visibility timeout expired', 'token', '')
+        redis.call('LPUSH', prefix .. ':dead', id)
+    else
+        push(id, true)
+    end
+end
+if redis.call('ZCARD', processing) >= tonumber(ARGV[5]) then
+    return false
+end
+for index = 7, #ARGV do
+    local priority = ARGV[index]
+    local tenants = prefix .. ':tenants:' .. priority
+    local head = redis.call('ZRANGE', tenants, 0, 0, 'WITHSCORES')
+    while head[1] do
+        local tenant, start = head[1], tonumber(head[2])
+        local ready = prefix .. ':ready:' .. priority .. ':' .. tenant
+        local id = redis.call('RPOP', ready)
+        if not id then
+            redis.call('ZREM', tenants, tenant)
+        else
+            local job = prefix .. ':job:' .. id
+            if redis.call('EXISTS', job) == 1 then
+                local weight = redis.call('HGET', prefix .. ':weights', tenant)
+                local finish = start + 1 / tonumber(weight or '1')
+                redis.call('SET', prefix .. ':clock:' .. priority, start)
+                if redis.call('LLEN', ready) > 0 then
+                    redis.call('ZADD', tenants, finish, tenant)
+                else
+                    redis.call('ZREM', tenants, tenant)
+                    redis.call('HSET', prefix .. ':finish:' .. priority, tenant, finish)
+                end
+                redis.call('ZADD', processing, deadline, id)
+                local attempts = redis.call('HINCRBY', job, 'attempts', 1)
+                redis.call('HSET', job, 'token', token)
+                return {
+                    id,
+                    redis.call('HGET', job, 'name'),
+                    redis.call('HGET', job, 'payload'),
+                    attempts,
+                }
+            end
+        end
+        head = redis.call('ZRANGE', tenants, 0, 0, 'WITHSCORES')
+    end
+end
+return false
+"""
+)
+
+ACK_SCRIPT = """
+if redis.call('HGET', KEYS[2], 'token') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+EXTEND_SCRIPT = """
+if redis.call('HGET', KEYS[2], 'token') ~= ARGV[2] then
+    return 0
+end
+return redis.call('ZADD', KEYS[1], 'XX', 'CH', ARGV[3], ARGV[1])
+"""
+
+RETRY_SCRIPT = """
+if redis.call('HGET', KEYS[4], 'token') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HSET', KEYS[4], 'error', ARGV[4], 'token', '')
+if ARGV[5] == '1' then
+    redis.call('LPUSH', KEYS[3], ARGV[1])
+else
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+end
+return 1
+"""
+
+DEFER_SCRIPT = """
+if redis.call('HGET', KEYS[3], 'token') ~= ARGV[2] then
+    return 0
+end
+if tonumber(redis.call('HGET', KEYS[3], 'deferrals') or '0') >= tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HINCRBY', KEYS[3], 'attempts', -1)
+redis.call('HINCRBY', KEYS[3], 'deferrals', 1)
+redis.call('HSET', KEYS[3], 'token', '')
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+return 1
+"""
+
+RELEASE_SCRIPT = (
+    SCHEDULING
+    + """
+local id, token = ARGV[2], ARGV[3]
+local job = prefix .. ':job:' .. id
+if redis.call('HGET', job, 'token') ~= token then
+    return 0
+end
+redis.call('ZREM', prefix .. ':processing', id)
+redis.call('HINCRBY', job, 'attempts', -1)
+redis.call('HSET', job, 'token', '')
+push(id, true)
+return 1
+"""
+)
+
+
+class JobQueue:
+    def __init__(self, name: str) -> None:
+        self.prefix = f"jobs:{name}"
+        self.delayed_key = f"{self.prefix}:delayed"
+        self.processing_key = f"{self.prefix}:processing"
+        self.dead_key = f"{self.prefix}:dead"
+        self.weights_key = f"{self.prefix}:weights"
+        self.enqueue_script = redis.register_script(ENQUEUE_SCRIPT)
+        self.reserve_script = redis.register_script(RESERVE_SCRIPT)
+        self.ack_script = redis.register_script(ACK_SCRIPT)
+        self.extend_script = redis.register_script(EXTEND_SCRIPT)
+        self.retry_script = redis.register_script(RETRY_SCRIPT)
+        self.release_script = redis.register_script(RELEASE_SCRIPT)
+        self.defer_script = redis.register_script(DEFER_SCRIPT)
+
+    def _job_key(self, id: str) -> str:
+        return f"{self.prefix}:job:{id}"
+
+    def _tenants_key(self, priority: JobPriority) -> str:
+        return f"{self.prefix}:tenants:{priority.value}"
+
+    def _ready_key(self, priority: JobPriority, tenant: str) -> str:
+        return f"{self.prefix}:ready:{priority.value}:{tenant}"
+
+    async def enqueue(
+        self,
+        name: str,
+        payload: Dict[str, Any],
+        tenant: str,
+        priority: JobPriority = JobPriority.INTERACTIVE,
+    ) -> str:
+        ids = await self.enqueue_many([(name, payload)], tenant, priority)
+        return ids[0]
+
+    async def enqueue_many(
+        self,
+        jobs: List[Tuple[str, Dict[str, Any]]],
+        tenant: str,
+        priority: JobPriority = JobPriority.INTERACTIVE,
+    ) -> List[str]:
+        ids = [uuid.uuid4().hex for _ in jobs]
+        if not jobs:
+            return ids
+        async with redis.pipeline(transaction=True) as pipe:
+            for id, (name, payload) in zip(ids, jobs):
+                pipe.hset(
+                    self._job_key(id),
+                    mapping={
+                        "name": name,
+                        "payload": json.dumps(payload),
+                        "tenant": tenant,
+                        "priority": priority.value,
+                        "attempts": 0,
+                        "enqueued_at": time.time(),
+                    },
+                )
+            weight = settings.job_tenant_weights.get(tenant)
+            if weight is None:
+                pipe.hdel(self.weights_key, tenant)
+            else:
+                pipe.hset(self.weights_key, tenant, weight)
+            await self.enqueue_script(args=[self.prefix, *ids], client=pipe)
+            await pipe.execute()
+        return ids
+
+    async def reserve(self) -> Optional[Job]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        reserved = await self.reserve_script(
+            args=[
+                self.prefix,
+                now,
+                now + settings.job_visibility_timeout_seconds,
+                token,
+                settings.job_global_concurrency,
+                settings.job_max_attempts,
+                *(priority.value for priority in JobPriority),
+            ],
+        )
+        if not reserved:
+            return None
+        id, name, payload, attempts = reserved
+        return Job(
+            id=id,
+            name=name,
+            payload=json.loads(payload),
+            attempts=int(attempts),
+            token=token,
+        )
+
+    async def ack(self, job: Job) -> bool:
+        return bool(
+            await self.ack_script(
+                keys=[self.processing_key, self._job_key(job.id)],
+                args=[job.id, job.token],
+            )
+        )
+
+    async def extend(self, job: Job) -> bool:
+        return bool(
+            await self.extend_script(
+                keys=[self.processing_key, self._job_key(job.id)],
+                args=[
+                    job.id,
+                    job.token,
+                    time.time() + settings.job_visibility_timeout_seconds,
+                ],
+            )
+        )
+
+    async def retry(self, job: Job, error: str) -> bool:
+        dead = job.attempts >= settings.job_max_attempts
+        due = time.time() + settings.job_retry_backoff_seconds * 2 ** (job.attempts - 1)
+        await self.retry_script(
+            keys=[
+                self.processing_key,
+                self.delayed_key,
+                self.dead_key,
+                self._job_key(job.id),
+            ],
+            args=[job.id, job.token, due, error, int(dead)],
+        )
+        return dead
+
+    async def defer(self, job: Job, delay: float) -> bool:
+        return bool(
+            await self.defer_script(
+                keys=[self.processing_key, self.delayed_key, self._job_key(job.id)],
+                args=[
+                    job.id,
+                    job.token,
+                    time.time() + delay,
+                    settings.job_max_deferrals,
+                ],
+            )
+        )
+
+    async def release(self, job: Job) -> bool:
+        return bool(await self.release_script(args=[self.prefix, job.id, job.token]))
+
+    async def depth(self) -> JobQueueDepth:
+        ready: Dict[str, Dict[str, int]] = {}
+        for priority in JobPriority:
+            tenants = await redis.zrange(self._tenants_key(priority), 0, -1)
+            async with redis.pipeline(transaction=False) as pipe:
+                for tenant in tenants:
+                    pipe.llen(self._ready_key(priority, tenant))
+                lengths = await pipe.execute()
+            ready[priority.value] = dict(zip(tenants, lengths))
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(self.delayed_key)
+            pipe.zcard(self.processing_key)
+            pipe.llen(self.dead_key)
+            delayed, processing, dead = await pipe.execute()
+        return JobQueueDepth(
+            ready=ready,
+            delayed=delayed,
+            processing=processing,
+            dead=dead,
+            concurrency_limit=settings.job_global_concurrency,
+        )
+
+
+job_queue = JobQueue("default")
@@ -0,0 +1,18 @@
+from typing import Any, Dict
+from pydantic import BaseModel
+
+
+class Job(BaseModel):
+    id: str
+    name: str
+    payload: Dict[str, Any]
+    attempts: int
+    token: str
+
+
+class JobQueueDepth(BaseModel):
+    ready: Dict[str, Dict[str, int]]
+    delayed: int
+    processing: int
+    dead: int
+    concurrency_limit: int
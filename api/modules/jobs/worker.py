@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Set
+from settings import settings
+from modules.jobs.exceptions import JobDeferredException
+from modules.jobs.queue import JobQueue
+from modules.jobs.schemas import Job
+from modules.metrics.services import MetricsService
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+class Worker:
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        concurrency: int,
+    ) -> None:
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.metrics = MetricsService()
+        self.stopping = asyncio.Event()
+        self.tasks: Set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        self.stopping.set()
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(settings.job_visibility_timeout_seconds / 3)
+            await self.queue.extend(job)
+
+    async def _execute(self, job: Job) -> None:
+        handler = self.handlers.get(job.name)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for {job.name!r}")
+            await handler(job)
+        except asyncio.CancelledError:
+            await self.queue.release(job)
+            await self.metrics.incr("jobs", "released")
+            raise
+        except JobDeferredException as e:
+            if await self.queue.defer(job, e.delay):
+                await self.metrics.incr("jobs", "deferred")
+            else:
+                dead = await self.queue.retry(job, repr(e))
+                await self.metrics.incr("jobs", "dead_lettered" if dead else "retried")
+        except Exception as e:
+            dead = await self.queue.retry(job, repr(e))
+            await self.metrics.incr("jobs", "dead_lettered" if dead else "retried")
+        else:
+            await self.queue.ack(job)
+            await self.metrics.incr("jobs", "completed")
+        finally:
+            heartbeat.cancel()
+
+    async def run(self) -> None:
+        stopping = asyncio.create_task(self.stopping.wait())
+        while not stopping.done():
+            if len(self.tasks) >= self.concurrency:
+                await asyncio.wait(
+                    {stopping, *self.tasks}, return_when=asyncio.FIRST_COMPLETED
+                )
+                continue
+            try:
+                job = await self.queue.reserve()
+            except Exception:
+                logger.exception("Failed to reserve a job")
+                job = None
+            if job is None:
+                await asyncio.wait(
+                    {stopping}, timeout=settings.job_poll_interval_seconds
+                )
+                continue
+            task = asyncio.create_task(self._execute(job))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        await self.drain()
+
+    async def drain(self) -> None:
+        if not self.tasks:
+            return
+        _, pending = await asyncio.wait(
+            set(self.tasks), timeout=settings.job_shutdown_grace_seconds
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,78 @@
+from typing import Optional
+from db import redis
+from settings import settings
+
+
+CHECK_SCRIPT = """
+local open = redis.call('PTTL', KEYS[1])
+if open > 0 then
+    return open
+end
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    if redis.call('SET', KEYS[3], '1', 'NX', 'PX', ARGV[1]) then
+        return 0
+    end
+    return math.max(1, redis.call('PTTL', KEYS[3]))
+end
+return 0
+"""
+
+FAILURE_SCRIPT = """
+local failures = redis.call('INCR', KEYS[1])
+if failures == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if failures < tonumber(ARGV[1]) and redis.call('EXISTS', KEYS[3]) == 0 then
+    return 0
+end
+redis.call('SET', KEYS[2], '1', 'PX', ARGV[3])
+redis.call('SET', KEYS[3], '1', 'PX', ARGV[3] * 2 + ARGV[2])
+redis.call('DEL', KEYS[1], KEYS[4])
+return 1
+"""
+
+
+class CircuitBreaker:
+    prefix = "llm_circuit"
+
+    def __init__(self) -> None:
+        self.check_script = redis.register_script(CHECK_SCRIPT)
+        self.failure_script = redis.register_script(FAILURE_SCRIPT)
+
+    def _keys(self, model: str) -> dict:
+        return {
+            name: f"{self.prefix}:{model}:{name}"
+            for name in ("failures", "open", "half_open", "probe")
+        }
+
+    async def retry_after(self, model: str) -> Optional[float]:
+        keys = self._keys(model)
+        wait = await self.check_script(
+            keys=[keys["open"], keys["half_open"], keys["probe"]],
+            args=[
+                int(
+                    settings.llm_timeout_seconds.get(
+                        model, settings.llm_default_timeout_seconds
+                    )
+                    * 1000
+                )
+            ],
+        )
+        return wait / 1000 if wait else None
+
+    async def record_failure(self, model: str) -> bool:
+        keys = self._keys(model)
+        return bool(
+            await self.failure_script(
+                keys=[keys["failures"], keys["open"], keys["half_open"], keys["probe"]],
+                args=[
+                    settings.llm_circuit_failure_threshold,
+                    int(settings.llm_circuit_window_seconds * 1000),
+                    int(settings.llm_circuit_open_seconds * 1000),
+                ],
+            )
+        )
+
+    async def record_success(self, model: str) -> None:
+        keys = self._keys(model)
+        await redis.delete(keys["failures"], keys["half_open"], keys["probe"])
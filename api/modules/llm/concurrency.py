@@ -0,0 +1,59 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from settings import settings
+
+
+class AdaptiveConcurrency:
+    def __init__(self) -> None:
+        self.limit = float(settings.llm_initial_concurrency)
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.decreased_at = 0.0
+        self.condition = asyncio.Condition()
+
+    @property
+    def slots(self) -> int:
+        return max(1, int(self.limit))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.slots)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def decrease(self) -> bool:
+        now = time.monotonic()
+        if now - self.decreased_at < settings.llm_concurrency_decrease_cooldown_seconds:
+            return False
+        self.decreased_at = now
+        self.limit = max(
+            float(settings.llm_min_concurrency),
+            self.limit * settings.llm_concurrency_decrease_factor,
+        )
+        return True
+
+    def increase(self) -> None:
+        self.limit = min(
+            float(settings.llm_max_concurrency), self.limit + 1 / self.limit
+        )
+
+    def record_latency(self, latency: float) -> bool:
+        spike = (
+            self.latency is not None
+            and latency > self.latency * settings.llm_latency_spike_ratio
+        )
+        self.latency = (
+            latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+        )
+        if spike:
+            return self.decrease()
+        self.increase()
+        return False
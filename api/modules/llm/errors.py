@@ -0,0 +1,53 @@
+import asyncio
+from typing import Iterator, Optional
+
+RATE_LIMIT_ERROR_NAMES = ("RateLimit", "ResourceExhausted", "TooManyRequests")
+TRANSIENT_ERROR_NAMES = (
+    "Connection",
+    "Timeout",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+)
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def error_chain(error: Optional[BaseException]) -> Iterator[BaseException]:
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    for cause in error_chain(error):
+        for attribute in ("status_code", "code"):
+            code = getattr(cause, attribute, None)
+            if isinstance(code, int):
+                return int(code)
+    return None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    if status_code(error) == 429:
+        return True
+    return any(
+        name in type(cause).__name__
+        for cause in error_chain(error)
+        for name in RATE_LIMIT_ERROR_NAMES
+    )
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    code = status_code(error)
+    if code is not None and 400 <= code < 600:
+        return code in RETRYABLE_STATUS_CODES or code >= 500
+    return is_rate_limited(error) or any(
+        getattr(cause, "is_retryable", False)
+        or isinstance(cause, (TimeoutError, ConnectionError))
+        or any(name in type(cause).__name__ for name in TRANSIENT_ERROR_NAMES)
+        for cause in error_chain(error)
+    )
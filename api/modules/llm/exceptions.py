@@ -0,0 +1,5 @@
+class ProviderUnavailableException(Exception):
+    def __init__(self, model: str, retry_after: float) -> None:
+        super().__init__(f"{model} is unavailable, retry in {retry_after:.1f}s")
+        self.model = model
+        self.retry_after = retry_after
@@ -0,0 +1,164 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+from settings import settings
+from modules.llm.circuit import CircuitBreaker
+from modules.llm.concurrency import AdaptiveConcurrency
+from modules.llm.errors import is_rate_limited, is_retryable
+from modules.llm.exceptions import ProviderUnavailableException
+from modules.llm.limiter import TokenBucketLimiter
+from modules.metrics.services import MetricsService
+
+T = TypeVar("T")
+
+CHARS_PER_TOKEN = 4
+PDF_PAGE_TOKENS = 258
+
+
+def estimate_tokens(*texts: str) -> int:
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN + 1
+
+
+class LLMGateway:
+    def __init__(self) -> None:
+        self.limiter = TokenBucketLimiter()
+        self.circuit = CircuitBreaker()
+        self.concurrency: Dict[str, AdaptiveConcurrency] = {}
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.metrics = MetricsService()
+
+    def controller(self, model: str) -> AdaptiveConcurrency:
+        return self.concurrency.setdefault(model, AdaptiveConcurrency())
+
+    def _latencies(self, model: str) -> Deque[float]:
+        return self.latencies.setdefault(
+            model, deque(maxlen=settings.llm_latency_window)
+        )
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        latencies = self._latencies(model)
+        if (
+            not settings.llm_hedging_enabled
+            or len(latencies) < settings.llm_hedge_min_samples
+        ):
+            return None
+        ordered = sorted(latencies)
+        return ordered[int(settings.llm_hedge_percentile * (len(ordered) - 1))]
+
+    def _timeout(self, model: str) -> float:
+        return settings.llm_timeout_seconds.get(
+            model, settings.llm_default_timeout_seconds
+        )
+
+    async def _count(self, model: str, **outcomes: int) -> None:
+        await self.metrics.incr_many(
+            "llm",
+            {
+                f"{model}:{outcome}": amount
+                for outcome, amount in outcomes.items()
+                if amount
+            },
+        )
+
+    async def _attempt(
+        self, model: str, call: Callable[[], Awaitable[T]], tokens: int
+    ) -> T:
+        controller = self.controller(model)
+        async with controller.slot():
+            waited = await self.limiter.acquire(model, tokens)
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(call(), self._timeout(model))
+            except Exception as e:
+                rate_limited = is_rate_limited(e)
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                decreased = controller.decrease() if rate_limited or timed_out else 0
+                await self._count(
+                    model,
+                    rate_limited=int(rate_limited),
+                    timeout=int(timed_out),
+                    concurrency_decreases=int(decreased),
+                    throttled_ms=int(waited * 1000),
+                )
+                raise
+            latency = time.monotonic() - started
+            decreased = controller.record_latency(latency)
+            self._latencies(model).append(latency)
+        await self._count(
+            model,
+            requests=1,
+            tokens=tokens,
+            throttled_ms=int(waited * 1000),
+            concurrency_decreases=int(decreased),
+        )
+        return result
+
+    async def _hedged(
+        self, model: str, call: Callable[[], Awaitable[T]], tokens: int
+    ) -> T:
+        primary = asyncio.create_task(self._attempt(model, call, tokens))
+        delay = self.hedge_delay(model)
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        await self._count(model, hedged=1)
+        hedge = asyncio.create_task(self._attempt(model, call, tokens))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            await self._count(model, hedge_wins=1)
+                        return task.result()
+            raise task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def invoke(
+        self, model: str, call: Callable[[], Awaitable[T]], tokens: int
+    ) -> T:
+        attempts = settings.llm_max_attempts
+        for attempt in range(attempts):
+            retry_after = await self.circuit.retry_after(model)
+            if retry_after is not None:
+                await self._count(model, circuit_open=1)
+                raise ProviderUnavailableException(model, retry_after)
+            try:
+                result = await self._hedged(model, call, tokens)
+            except Exception as e:
+                if not is_retryable(e):
+                    await self._count(model, errors=1)
+                    raise
+                if not is_rate_limited(e) and await self.circuit.record_failure(model):
+                    await self._count(model, circuit_trips=1)
+                if attempt == attempts - 1:
+                    await self._count(model, unavailable=1)
+                    raise ProviderUnavailableException(
+                        model, settings.llm_circuit_open_seconds
+                    ) from e
+                await self._count(model, retries=1)
+                await asyncio.sleep(
+                    random.uniform(
+                        0,
+                        min(
+                            settings.llm_retry_max_seconds,
+                            settings.llm_retry_base_seconds * 2**attempt,
+                        ),
+                    )
+                )
+                continue
+            await self.circuit.record_success(model)
+            await self._count(model, successes=1)
+            return result
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,73 @@
+import asyncio
+import random
+from typing import Optional
+from db import redis
+from settings import settings
+
+
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local function level(key, capacity, rate)
+    local bucket = redis.call('HMGET', key, 'level', 'updated')
+    local current = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    return math.min(capacity, current + math.max(0, now - updated) * rate)
+end
+
+local request_capacity, request_rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local token_capacity, token_rate = tonumber(ARGV[3]), tonumber(ARGV[4])
+local cost = math.min(tonumber(ARGV[5]), token_capacity)
+local requests = level(KEYS[1], request_capacity, request_rate)
+local tokens = level(KEYS[2], token_capacity, token_rate)
+local wait = math.max(0, (1 - requests) / request_rate, (cost - tokens) / token_rate)
+if wait > 0 then
+    return tostring(wait)
+end
+redis.call('HSET', KEYS[1], 'level', requests - 1, 'updated', now)
+redis.call('HSET', KEYS[2], 'level', tokens - cost, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(request_capacity / request_rate) + 60)
+redis.call('EXPIRE', KEYS[2], math.ceil(token_capacity / token_rate) + 60)
+return '0'
+"""
+
+
+class TokenBucketLimiter:
+    prefix = "llm_rate_limit"
+
+    def __init__(self) -> None:
+        self.script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def try_acquire(self, model: str, tokens: int) -> Optional[float]:
+        requests_per_minute = settings.llm_requests_per_minute.get(model)
+        tokens_per_minute = settings.llm_tokens_per_minute.get(model)
+        if not requests_per_minute or not tokens_per_minute:
+            return None
+        request_rate = requests_per_minute / 60
+        token_rate = tokens_per_minute / 60
+        burst = settings.llm_rate_limit_burst_seconds
+        wait = float(
+            await self.script(
+                keys=[
+                    f"{self.prefix}:{model}:requests",
+                    f"{self.prefix}:{model}:tokens",
+                ],
+                args=[
+                    max(1.0, request_rate * burst),
+                    request_rate,
+                    max(1.0, token_rate * burst),
+                    token_rate,
+                    tokens,
+                ],
+            )
+        )
+        return wait or None
+
+    async def acquire(self, model: str, tokens: int) -> float:
+        waited = 0.0
+        while (wait := await self.try_acquire(model, tokens)) is not None:
+            wait *= random.uniform(1.0, 1.2)
+            await asyncio.sleep(wait)
+            waited += wait
+        return waited
@@ -0,0 +1,21 @@
+from typing import Dict
+from fastapi import APIRouter
+from dependencies import ServiceDep
+from modules.jobs.schemas import JobQueueDepth
+
+metrics_router = APIRouter(prefix="/metrics")
+
+
+@metrics_router.get("")
+async def get_metrics(services: ServiceDep) -> Dict[str, Dict[str, int]]:
+    return await services.metrics.get_all()
+
+
+@metrics_router.get("/jobs/queue")
+async def get_job_queue_depth(services: ServiceDep) -> JobQueueDepth:
+    return await services.jobs.depth()
+
+
+@metrics_router.get("/{namespace}")
+async def get_namespace_metrics(namespace: str, services: ServiceDep) -> Dict[str, int]:
+    return await services.metrics.get(namespace)
@@ -0,0 +1,24 @@
+from typing import Dict
+from db import redis
+
+
+class MetricsService:
+    async def incr(self, namespace: str, field: str, amount: int = 1) -> None:
+        await redis.hincrby(f"metrics:{namespace}", field, amount)
+
+    async def incr_many(self, namespace: str, amounts: Dict[str, int]) -> None:
+        async with redis.pipeline(transaction=False) as pipe:
+            for field, amount in amounts.items():
+                pipe.hincrby(f"metrics:{namespace}", field, amount)
+            await pipe.execute()
+
+    async def get(self, namespace: str) -> Dict[str, int]:
+        values = await redis.hgetall(f"metrics:{namespace}")
+        return {field: int(value) for field, value in values.items()}
+
+    async def get_all(self) -> Dict[str, Dict[str, int]]:
+        metrics: Dict[str, Dict[str, int]] = {}
+        async for key in redis.scan_iter(match="metrics:*"):
+            namespace = key.removeprefix("metrics:")
+            metrics[namespace] = await self.get(namespace)
+        return metrics
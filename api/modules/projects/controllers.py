@@ -1,8 +1,17 @@
 from typing import List
 from beanie import PydanticObjectId
-from fastapi import APIRouter, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Header,
+    HTTPException,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from modules.projects.schemas import (
     ProjectCreate,
+    ProjectDeletionResponse,
     ProjectResponse,
     ProjectUpdate,
 )
@@ -11,6 +20,7 @@ from modules.projects.exceptions import (
     ProjectNotFoundException,
     ProjectLimitReachedException,
 )
+from modules.projects.deletion import deletion_progress, schedule_project_deletion
 from dependencies import ServiceDep, OrganizationIdDep
 
 projects_router = APIRouter(prefix="/projects")
@@ -58,6 +68,31 @@ async def get_project(
         )
 
 
+@projects_router.get("/{project_id}/events")
+async def get_project_events(
+    project_id: PydanticObjectId,
+    services: ServiceDep,
+    organization_id: OrganizationIdDep,
+    request: Request,
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+) -> StreamingResponse:
+    try:
+        project = await services.projects.get_by_id(
+            id=project_id, organization_id=organization_id
+        )
+        return StreamingResponse(
+            services.statements.project_status_event(
+                project.id, request, last_event_id=last_event_id
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except ProjectNotFoundException:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
+        )
+
+
 @projects_router.put("/{project_id}")
 async def update_project(
     project_id: PydanticObjectId,
@@ -81,18 +116,36 @@ async def update_project(
         )
 
 
-@projects_router.delete("/{project_id}")
+@projects_router.delete("/{project_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_project(
     project_id: PydanticObjectId,
     services: ServiceDep,
     organization_id: OrganizationIdDep,
-):
+    background_tasks: BackgroundTasks,
+) -> ProjectDeletionResponse:
     try:
-        await services.statements.delete_all(
+        await services.projects.mark_deleting(
+            id=project_id, organization_id=organization_id
+        )
+        return await schedule_project_deletion(
             project_id=project_id,
+            organization_id=organization_id,
+            background_tasks=background_tasks,
         )
-        await services.projects.delete(id=project_id, organization_id=organization_id)
     except ProjectNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
         )
+
+
+@projects_router.get("/{project_id}/deletion")
+async def get_project_deletion(
+    project_id: PydanticObjectId,
+    organization_id: OrganizationIdDep,
+) -> ProjectDeletionResponse:
+    progress = await deletion_progress.get(project_id, organization_id)
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Project deletion not found"
+        )
+    return progress
@@ -0,0 +1,137 @@
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from beanie import PydanticObjectId
+from fastapi import BackgroundTasks
+from db import redis
+from settings import settings
+from modules.files.services import FileService
+from modules.jobs.enums import JobPriority
+from modules.jobs.queue import job_queue
+from modules.jobs.schemas import Job
+from modules.projects.enums import DeletionStatus
+from modules.projects.schemas import ProjectDeletionResponse
+from modules.projects.services import ProjectService
+from modules.statements.services import StatementService
+
+DELETE_PROJECT_JOB = "delete_project"
+
+logger = logging.getLogger(__name__)
+
+project_service = ProjectService()
+statement_service = StatementService()
+file_service = FileService()
+
+
+class ProjectDeletionProgress:
+    prefix = "project_deletion"
+
+    def _key(self, project_id: PydanticObjectId) -> str:
+        return f"{self.prefix}:{project_id}"
+
+    async def set(self, project_id: PydanticObjectId, **fields) -> None:
+        key = self._key(project_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                key,
+                mapping={
+                    **fields,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                },
+            )
+            pipe.expire(key, settings.cascade_delete_progress_ttl_seconds)
+            await pipe.execute()
+
+    async def incr(self, project_id: PydanticObjectId, field: str, amount: int) -> None:
+        key = self._key(project_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, field, amount)
+            pipe.hset(key, "updated_at", datetime.now(timezone.utc).isoformat())
+            await pipe.execute()
+
+    async def get(
+        self, project_id: PydanticObjectId, organization_id: str
+    ) -> Optional[ProjectDeletionResponse]:
+        progress = await redis.hgetall(self._key(project_id))
+        if not progress or progress.get("organization_id") != organization_id:
+            return None
+        return ProjectDeletionResponse(project_id=project_id, **progress)
+
+
+deletion_progress = ProjectDeletionProgress()
+
+
+async def delete_project_data(
+    project_id: PydanticObjectId, organization_id: str
+) -> None:
+    await deletion_progress.set(
+        project_id,
+        organization_id=organization_id,
+        status=DeletionStatus.RUNNING.value,
+    )
+
+    async def report(field: str, deleted: int) -> None:
+        await deletion_progress.incr(project_id, field, deleted)
+
+    async def report_files(deleted: int) -> None:
+        await report("files", deleted)
+
+    try:
+        await statement_service.delete_all(
+            project_id=project_id,
+            organization_id=organization_id,
+            on_progress=report,
+        )
+        await file_service.delete_project_files(
+            organization_id=organization_id,
+            project_id=str(project_id),
+            on_progress=report_files,
+        )
+        await project_service.delete(id=project_id, organization_id=organization_id)
+    except Exception as e:
+        await deletion_progress.set(
+            project_id, status=DeletionStatus.FAILED.value, error=str(e)
+        )
+        raise
+    await deletion_progress.set(project_id, status=DeletionStatus.COMPLETED.value)
+
+
+async def schedule_project_deletion(
+    project_id: PydanticObjectId,
+    organization_id: str,
+    background_tasks: BackgroundTasks,
+) -> ProjectDeletionResponse:
+    await deletion_progress.set(
+        project_id,
+        organization_id=organization_id,
+        status=DeletionStatus.PENDING.value,
+        transactions=0,
+        statements=0,
+        files=0,
+    )
+    if settings.statement_queue_backend == "redis":
+        await job_queue.enqueue(
+            DELETE_PROJECT_JOB,
+            {"project_id": str(project_id), "organization_id": organization_id},
+            tenant=organization_id,
+            priority=JobPriority.BULK,
+        )
+    else:
+        background_tasks.add_task(delete_project_data, project_id, organization_id)
+    return await deletion_progress.get(project_id, organization_id)
+
+
+async def resume_project_deletions() -> None:
+    if settings.statement_queue_backend == "redis":
+        return
+    for project in await project_service.get_deleting():
+        try:
+            await delete_project_data(project.id, project.organization_id)
+        except Exception:
+            logger.exception("Failed to resume deletion of project %s", project.id)
+
+
+async def handle_delete_project(job: Job) -> None:
+    await delete_project_data(
+        PydanticObjectId(job.payload["project_id"]), job.payload["organization_id"]
+    )
@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class ProjectStatus(str, Enum):
+    ACTIVE = "active"
+    DELETING = "deleting"
+
+
+class DeletionStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
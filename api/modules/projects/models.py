@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Annotated, List, Optional
 
 from pydantic import Field
+from modules.projects.enums import ProjectStatus
 
 if TYPE_CHECKING:
     from modules.statements.models import Statement
@@ -14,6 +15,7 @@ class Project(Document):
     name: str
     organization_id: Annotated[str, Indexed()]
     color: str
+    status: str = ProjectStatus.ACTIVE.value
     statements: Optional[List[BackLink["Statement"]]] = Field(  # noqa: F821  # pyright: ignore[reportUndefinedVariable]
         default=None,
         exclude=True,
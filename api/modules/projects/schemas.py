@@ -2,6 +2,7 @@ from typing import Annotated, List, Optional
 from pydantic import AfterValidator, BaseModel, Field
 from beanie import PydanticObjectId
 from datetime import datetime
+from modules.projects.enums import DeletionStatus
 from modules.statements.schemas import StatementResponse
 
 
@@ -34,3 +35,13 @@ class ProjectWithStatementsResponse(ProjectResponse):
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
     color: Optional[str] = None
+
+
+class ProjectDeletionResponse(BaseModel):
+    project_id: PydanticObjectId
+    status: DeletionStatus
+    transactions: int = 0
+    statements: int = 0
+    files: int = 0
+    error: Optional[str] = None
+    updated_at: datetime
@@ -9,6 +9,7 @@ from modules.projects.exceptions import (
     ProjectNotFoundException,
     ProjectLimitReachedException,
 )
+from modules.projects.enums import ProjectStatus
 from modules.projects.models import Project
 from modules.projects.schemas import ProjectCreate, ProjectUpdate
 
@@ -30,11 +31,18 @@ class ProjectService:
             raise ProjectAlreadyExistsException
 
     async def get_all(self, organization_id: str) -> List[Project]:
-        return await Project.find(Project.organization_id == organization_id).to_list()
+        return await Project.find(
+            Project.organization_id == organization_id,
+            Project.status != ProjectStatus.DELETING.value,
+        ).to_list()
 
     async def get_by_id(self, id: PydanticObjectId, organization_id: str) -> Project:
         project = await Project.find_one(
-            And(Project.id == id, Project.organization_id == organization_id),
+            And(
+                Project.id == id,
+                Project.organization_id == organization_id,
+                Project.status != ProjectStatus.DELETING.value,
+            ),
         )
         if not project:
             raise ProjectNotFoundException
@@ -57,6 +65,7 @@ class ProjectService:
                 And(
                     Project.id == id,
                     Project.organization_id == organization_id,
+                    Project.status != ProjectStatus.DELETING.value,
                 )
             ).set(update_data)
 
@@ -64,6 +73,26 @@ class ProjectService:
         except DuplicateKeyError:
             raise ProjectAlreadyExistsException
 
+    async def mark_deleting(self, id: PydanticObjectId, organization_id: str) -> None:
+        result = await Project.find_one(
+            And(Project.id == id, Project.organization_id == organization_id)
+        ).update(
+            {
+                "$set": {
+                    Project.status: ProjectStatus.DELETING.value,
+                    Project.updated_at: datetime.now(timezone.utc),
+                }
+            }
+        )
+        if not result.matched_count:
+            raise ProjectNotFoundException
+
+    async def get_deleting(self) -> List[Project]:
+        return await Project.find(
+            Project.status == ProjectStatus.DELETING.value
+        ).to_list()
+
     async def delete(self, id: PydanticObjectId, organization_id: str) -> None:
-        project = await self.get_by_id(id=id, organization_id=organization_id)
-        await project.delete()
+        await Project.find_one(
+            And(Project.id == id, Project.organization_id == organization_id)
+        ).delete()
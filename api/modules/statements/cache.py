@@ -0,0 +1,257 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+from db import redis
+from settings import settings
+from modules.metrics.services import MetricsService
+from modules.statements.constant import (
+    STATEMENT_CHUNK_PROMPT,
+    STATEMENT_DOCUMENT_PROMPT,
+    STATEMENT_PROCESSING_SYSTEM_PROMPT,
+    STATEMENT_PROCESSING_HUMAN_PROMPT,
+    STATEMENT_TEXT_PROMPT,
+    TRANSACTION_BATCH_EMBEDDING_PROMPT,
+    TRANSACTION_EMBEDDING_PROMPT,
+)
+from modules.statements.enums import TransactionType
+from modules.statements.llms import (
+    embeddings,
+    statement_processing_model,
+    transaction_embedding_model,
+)
+from modules.statements.schemas import StatementAiProcessing, TransactionEnrichment
+from modules.statements.utils import normalize_description
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+STATEMENT_EXTRACTION_CACHE_VERSION = hashlib.sha256(
+    "\0".join(
+        [
+            statement_processing_model.model,
+            STATEMENT_PROCESSING_SYSTEM_PROMPT,
+            STATEMENT_PROCESSING_HUMAN_PROMPT,
+            STATEMENT_DOCUMENT_PROMPT,
+            STATEMENT_CHUNK_PROMPT,
+            STATEMENT_TEXT_PROMPT,
+        ]
+    ).encode("utf-8")
+).hexdigest()[:16]
+
+TRANSACTION_ENRICHMENT_CACHE_VERSION = hashlib.sha256(
+    "\0".join(
+        [
+            transaction_embedding_model.model_name,
+            embeddings.model,
+            TRANSACTION_EMBEDDING_PROMPT,
+            TRANSACTION_BATCH_EMBEDDING_PROMPT,
+        ]
+    ).encode("utf-8")
+).hexdigest()[:16]
+
+
+class StatementExtractionCache:
+    prefix = "statement_extraction"
+
+    def __init__(self) -> None:
+        self.metrics = MetricsService()
+        self.index_key = f"{self.prefix}:{STATEMENT_EXTRACTION_CACHE_VERSION}:index"
+
+    def key(self, file_content: bytes) -> str:
+        digest = hashlib.sha256(file_content).hexdigest()
+        return f"{self.prefix}:{STATEMENT_EXTRACTION_CACHE_VERSION}:{digest}"
+
+    async def get(self, file_content: bytes) -> Optional[StatementAiProcessing]:
+        key = self.key(file_content)
+        cached = await redis.get(key)
+        if cached is None:
+            await redis.zrem(self.index_key, key)
+            await self.metrics.incr(self.prefix, "misses")
+            return None
+        await redis.zadd(self.index_key, {key: time.time()})
+        await self.metrics.incr(self.prefix, "hits")
+        return StatementAiProcessing.model_validate_json(cached)
+
+    async def set(self, file_content: bytes, result: StatementAiProcessing) -> None:
+        key = self.key(file_content)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(
+                key,
+                result.model_dump_json(),
+                ex=settings.statement_extraction_cache_ttl_seconds,
+            )
+            pipe.zadd(self.index_key, {key: time.time()})
+            pipe.expire(self.index_key, settings.statement_extraction_cache_ttl_seconds)
+            await pipe.execute()
+        await self.evict()
+
+    async def evict(self) -> None:
+        overflow = (
+            await redis.zcard(self.index_key)
+            - settings.statement_extraction_cache_max_entries
+        )
+        if overflow <= 0:
+            return
+        evicted = await redis.zpopmin(self.index_key, overflow)
+        keys = [key for key, _ in evicted]
+        if keys:
+            await redis.delete(*keys)
+            await self.metrics.incr(self.prefix, "evictions", len(keys))
+
+    async def invalidate(self, file_content: bytes) -> None:
+        key = self.key(file_content)
+        await redis.delete(key)
+        await redis.zrem(self.index_key, key)
+
+
+class LRUCache(Generic[K, V]):
+    def __init__(
+        self, max_size: int, weigh: Optional[Callable[[V], int]] = None
+    ) -> None:
+        self.max_size = max_size
+        self.weigh = weigh or (lambda value: 1)
+        self.entries: OrderedDict[K, V] = OrderedDict()
+        self.weights: Dict[K, int] = {}
+        self.weight = 0
+
+    def get(self, key: K) -> Optional[V]:
+        value = self.entries.get(key)
+        if value is None:
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self.evict(key)
+        weight = self.weigh(value)
+        if weight > self.max_size:
+            return
+        self.entries[key] = value
+        self.weights[key] = weight
+        self.weight += weight
+        while self.weight > self.max_size:
+            evicted, _ = self.entries.popitem(last=False)
+            self.weight -= self.weights.pop(evicted)
+
+    def evict(self, key: K) -> None:
+        if self.entries.pop(key, None) is not None:
+            self.weight -= self.weights.pop(key)
+
+
+class TransactionEnrichmentCache:
+    prefix = "transaction_enrichment"
+
+    def __init__(self) -> None:
+        self.metrics = MetricsService()
+        self.local: LRUCache[str, TransactionEnrichment] = LRUCache(
+            settings.transaction_enrichment_cache_size
+        )
+
+    def key(self, transaction_type: TransactionType | str, description: str) -> str:
+        if isinstance(transaction_type, TransactionType):
+            transaction_type = transaction_type.value
+        normalized = "\0".join(
+            [str(transaction_type).lower(), normalize_description(description)]
+        )
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{TRANSACTION_ENRICHMENT_CACHE_VERSION}:{digest}"
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, TransactionEnrichment]:
+        found: Dict[str, TransactionEnrichment] = {}
+        remote_keys: List[str] = []
+        for key in dict.fromkeys(keys):
+            entry = self.local.get(key)
+            if entry is None:
+                remote_keys.append(key)
+            else:
+                found[key] = entry
+        local_hits = len(found)
+        remote_hits = 0
+        if remote_keys:
+            for key, value in zip(remote_keys, await redis.mget(remote_keys)):
+                if value is None:
+                    continue
+                entry = TransactionEnrichment.model_validate_json(value)
+                self.local.set(key, entry)
+                found[key] = entry
+                remote_hits += 1
+        await self.metrics.incr_many(
+            self.prefix,
+            {
+                "lru_hits": local_hits,
+                "lru_misses": len(remote_keys),
+                "redis_hits": remote_hits,
+                "redis_misses": len(remote_keys) - remote_hits,
+            },
+        )
+        return found
+
+    async def set_many(self, entries: Dict[str, TransactionEnrichment]) -> None:
+        if not entries:
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, entry in entries.items():
+                self.local.set(key, entry)
+                pipe.set(
+                    key,
+                    entry.model_dump_json(),
+                    ex=settings.transaction_enrichment_cache_ttl_seconds,
+                )
+            await pipe.execute()
+
+    async def invalidate(self, keys: Iterable[str]) -> int:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+        for key in keys:
+            self.local.evict(key)
+        deleted = await redis.delete(*keys)
+        await self.metrics.incr(self.prefix, "invalidated", deleted)
+        return deleted
+
+
+class ListingCountCache:
+    prefix = "listing_count"
+
+    def __init__(self) -> None:
+        self.metrics = MetricsService()
+
+    def _version_key(self, project_id: Any) -> str:
+        return f"{self.prefix}:{project_id}:version"
+
+    async def key(self, project_id: Any, scope: Sequence[Any]) -> str:
+        version = int(await redis.get(self._version_key(project_id)) or 0)
+        digest = hashlib.sha256(
+            json.dumps(list(scope), default=str).encode("utf-8")
+        ).hexdigest()
+        return f"{self.prefix}:{project_id}:{version}:{digest}"
+
+    async def get(self, key: str) -> Optional[int]:
+        cached = await redis.get(key)
+        await self.metrics.incr(self.prefix, "misses" if cached is None else "hits")
+        return None if cached is None else int(cached)
+
+    async def set(self, key: str, total: int) -> None:
+        await redis.set(key, total, ex=settings.listing_count_cache_ttl_seconds)
+
+    async def invalidate(self, project_id: Any) -> None:
+        await redis.incr(self._version_key(project_id))
+
+
+statement_extraction_cache = StatementExtractionCache()
+transaction_enrichment_cache = TransactionEnrichmentCache()
+listing_count_cache = ListingCountCache()
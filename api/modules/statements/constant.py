@@ -115,12 +115,28 @@ Ejemplo de Salida JSON Esperada (correspondiente al fragmento anterior):
 }}"""
 
 
+STATEMENT_DOCUMENT_PROMPT = """
+Este documento es el extracto completo.
+"""
+
+STATEMENT_CHUNK_PROMPT = """
+Este documento es un fragmento del extracto: páginas {first_page} a {last_page} de {page_count}.
+Extrae únicamente las transacciones que aparecen en estas páginas, en el mismo orden del documento.
+Si el saldo anterior o el saldo final no aparecen en este fragmento, usa null.
+"""
+
+
+STATEMENT_TEXT_PROMPT = """
+Texto extraído del extracto (las columnas están separadas por espacios):
+{text}
+"""
+
+
 TRANSACTION_EMBEDDING_PROMPT = """
 Eres un asistente que enriquece descripciones de transacciones bancarias para usarlas en un sistema de búsqueda semántica.
 
 Recibirás los siguientes datos de una transacción:
 - Tipo: {tx_type}
-- Monto: {amount} pesos
 - Descripción original: "{description}"
 
 Tu tarea:
@@ -132,3 +148,30 @@ Devuelve el resultado en un JSON con la siguiente estructura:
     "description": "descripción en español"
 }}
 """
+
+TRANSACTION_BATCH_EMBEDDING_PROMPT = """
+Eres un asistente que enriquece descripciones de transacciones bancarias para usarlas en un sistema de búsqueda semántica.
+
+Recibirás una lista JSON de transacciones. Cada una tiene:
+- "index": identificador de la transacción dentro de la lista
+- "type": tipo de transacción (gasto o ingreso)
+- "description": descripción original
+
+Transacciones:
+{transactions}
+
+Tu tarea, para cada transacción de la lista:
+1. Genera una descripción más clara y detallada en **español**, que sea útil para búsquedas.
+2. Incluye contexto financiero si aplica (por ejemplo: si es un impuesto, aclara que es bancario; si es un pago en comercio, di que es una compra en establecimiento).
+
+Devuelve exactamente un elemento por transacción, en el mismo orden y con el mismo "index" que recibiste, en un JSON con la siguiente estructura:
+{{
+    "descriptions": [
+        {{"index": 0, "description": "descripción en español"}}
+    ]
+}}
+"""
+
+PROCESS_STATEMENT_JOB = "process_statement"
+
+DUPLICATE_KEY_ERROR = 11000
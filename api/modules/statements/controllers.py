@@ -1,3 +1,4 @@
+import math
 from beanie import PydanticObjectId
 from fastapi import (
     APIRouter,
@@ -8,11 +9,17 @@ from fastapi import (
     Request,
 )
 from fastapi.responses import StreamingResponse
+from settings import settings
 from dependencies import ServiceDep
 from dependencies import OrganizationIdDep
 from modules.projects.exceptions import ProjectNotFoundException
-from modules.statements.enums import StatementStatus
-from modules.statements.exceptions import StatementNotFoundException
+from modules.statements.enums import CountMode, StatementStatus
+from modules.statements.exceptions import (
+    InvalidCursorException,
+    StaleProcessingTokenException,
+    StatementBusyException,
+    StatementNotFoundException,
+)
 from modules.statements.schemas import (
     StatementResponse,
     StatementUpdate,
@@ -21,11 +28,15 @@ from modules.statements.schemas import (
     TransactionCreate,
     TransactionUpdate,
     TransactionResponse,
+    TransactionSearchResponse,
 )
 from fastapi import Query
 from modules.statements.exceptions import TransactionNotFoundException
+from modules.statements.jobs import process_statement
+from modules.llm.exceptions import ProviderUnavailableException
 
 statements_router = APIRouter(prefix="/projects/{project_id}/statements")
+transactions_router = APIRouter(prefix="/projects/{project_id}/transactions")
 
 
 @statements_router.post("")
@@ -47,41 +58,46 @@ async def upload_statement(
             project_id, organization_id=organization_id
         )
 
+        errors = []
         for file in files:
             if file.content_type != "application/pdf":
-                await services.statements.create_statement_in_db(
-                    name=file.filename,
-                    status=StatementStatus.FAILED,
-                    project=project,
-                    error="Only PDF files are allowed",
-                )
-                continue
-            if file.size > 10 * 1024 * 1024:
-                await services.statements.create_statement_in_db(
-                    name=file.filename,
-                    status=StatementStatus.FAILED,
-                    project=project,
-                    error="File size must be less than 10MB",
-                )
+                errors.append("Only PDF files are allowed")
+            elif file.size > 10 * 1024 * 1024:
+                errors.append("File size must be less than 10MB")
+            else:
+                errors.append(None)
+        statements = await services.statements.create_statements_in_db(
+            project=project,
+            statements=[(file.filename, error) for file, error in zip(files, errors)],
+        )
+        pending = [
+            (file, statement)
+            for file, statement, error in zip(files, statements, errors)
+            if error is None
+        ]
+        upload_errors = await services.files.upload_files(
+            files=[(file, statement.id) for file, statement in pending],
+            organization_id=organization_id,
+            project_id=project_id,
+        )
+        uploaded = []
+        for (_, statement), upload_error in zip(pending, upload_errors):
+            if upload_error is None:
+                uploaded.append(statement)
                 continue
-            statement = await services.statements.create_statement_in_db(
-                name=file.filename,
-                status=StatementStatus.PENDING,
-                project=project,
-            )
-            await services.files.upload_file(
-                file=file,
-                organization_id=organization_id,
-                project_id=project_id,
-                statement_id=statement.id,
-            )
-            await services.statements.send_statement_to_queue(
-                statement=statement,
-                request=request,
-                project_id=project_id,
+            await services.statements.mark_failed(
+                id=statement.id,
+                project_id=project.id,
                 organization_id=organization_id,
-                user_id=user_id,
+                error="File upload failed",
             )
+        await services.statements.send_statements_to_queue(
+            statements=uploaded,
+            request=request,
+            project_id=project_id,
+            organization_id=organization_id,
+            user_id=user_id,
+        )
         return {"status": "success", "message": "Statements uploaded"}
     except ProjectNotFoundException:
         raise HTTPException(
@@ -97,13 +113,8 @@ async def get_statement(
     organization_id: OrganizationIdDep,
 ) -> StatementResponse:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
-        return await services.statements.get_by_id(statement_id, project_id=project.id)
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
+        return await services.statements.get_by_id(
+            statement_id, project_id=project_id, organization_id=organization_id
         )
     except StatementNotFoundException:
         raise HTTPException(
@@ -120,23 +131,37 @@ async def list_statements(
     offset: int = Query(0, ge=0),
     search: str | None = Query(default=None),
     statement_status: StatementStatus | None = Query(default=None, alias="status"),
+    cursor: str | None = Query(default=None),
+    count: CountMode = Query(default=CountMode.EXACT),
 ) -> StatementsPaginatedResponse:
     try:
         project = await services.projects.get_by_id(
             project_id, organization_id=organization_id
         )
-        statements, total = await services.statements.list_paginated(
+        statements, total, next_cursor = await services.statements.list_paginated(
             project_id=project.id,
+            organization_id=organization_id,
             limit=limit,
             offset=offset,
             search=search,
             status=statement_status,
-        )
-        return {"statements": statements, "total": total}
+            cursor=cursor,
+            count=count,
+        )
+        return {
+            "statements": statements,
+            "total": total,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }
     except ProjectNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
         )
+    except InvalidCursorException:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
 
 
 @statements_router.get("/{statement_id}/transactions")
@@ -148,27 +173,38 @@ async def list_statement_transactions(
     limit: int = Query(10, ge=1),
     offset: int = Query(0, ge=0),
     search: str | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    count: CountMode = Query(default=CountMode.EXACT),
 ) -> TransactionsPaginatedResponse:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
-        transactions, total = await services.statements.list_transactions_paginated(
+        (
+            transactions,
+            total,
+            next_cursor,
+        ) = await services.statements.list_transactions_paginated(
             statement_id=statement_id,
-            project_id=project.id,
+            project_id=project_id,
+            organization_id=organization_id,
             limit=limit,
             offset=offset,
             search=search,
-        )
-        return {"transactions": transactions, "total": total}
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
-        )
+            cursor=cursor,
+            count=count,
+        )
+        return {
+            "transactions": transactions,
+            "total": total,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }
     except StatementNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found"
         )
+    except InvalidCursorException:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
 
 
 @statements_router.get("/{statement_id}/transactions/{transaction_id}")
@@ -180,21 +216,11 @@ async def get_transaction(
     organization_id: OrganizationIdDep,
 ) -> TransactionResponse:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
-        # Valida statement y ownership a través del servicio
-        await services.statements.get_by_id(statement_id, project_id=project.id)
         return await services.statements.get_transaction_by_id(
-            transaction_id=transaction_id, project_id=project.id
-        )
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
-        )
-    except StatementNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found"
+            transaction_id=transaction_id,
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
         )
     except TransactionNotFoundException:
         raise HTTPException(
@@ -211,20 +237,22 @@ async def create_transaction(
     body: TransactionCreate,
 ) -> TransactionResponse:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
         return await services.statements.create_transaction(
-            statement_id=statement_id, project_id=project.id, data=body
-        )
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
+            data=body,
         )
     except StatementNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found"
         )
+    except ProviderUnavailableException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model provider unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
 
 
 @statements_router.put("/{statement_id}/transactions/{transaction_id}")
@@ -237,27 +265,23 @@ async def update_transaction(
     body: TransactionUpdate,
 ) -> TransactionResponse:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
-        await services.statements.get_by_id(statement_id, project_id=project.id)
         return await services.statements.update_transaction(
             transaction_id=transaction_id,
-            project_id=project.id,
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
             data=body.model_dump(exclude_none=True),
         )
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
-        )
-    except StatementNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found"
-        )
     except TransactionNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
         )
+    except ProviderUnavailableException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model provider unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
 
 
 @statements_router.delete("/{statement_id}/transactions/{transaction_id}")
@@ -269,22 +293,13 @@ async def delete_transaction(
     organization_id: OrganizationIdDep,
 ) -> dict:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
-        await services.statements.get_by_id(statement_id, project_id=project.id)
         await services.statements.delete_transaction(
-            transaction_id=transaction_id, project_id=project.id
+            transaction_id=transaction_id,
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
         )
         return {"status": "success"}
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
-        )
-    except StatementNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found"
-        )
     except TransactionNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found"
@@ -294,60 +309,36 @@ async def delete_transaction(
 @statements_router.post("/{statement_id}")
 async def create_statement(
     statement_id: PydanticObjectId,
-    services: ServiceDep,
     project_id: PydanticObjectId,
     organization_id: OrganizationIdDep,
 ) -> dict:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
-        statement = await services.statements.get_by_id(
-            statement_id, project_id=project.id
-        )
-        file_content = await services.files.get_file(
-            organization_id=organization_id,
-            project_id=project_id,
-            statement_id=statement.id,
-        )
-        await services.statements.update(
-            id=statement.id,
-            project_id=project.id,
-            statement_update=StatementUpdate(
-                status=StatementStatus.PROCESSING,
-            ),
-        )
-        status, current_balance, previous_balance = await services.statements.create(
-            statement=statement, file_content=file_content
+        statement_status = await process_statement(
+            statement_id, project_id, organization_id
         )
-        if status == StatementStatus.FAILED:
-            await services.statements.update(
-                id=statement.id,
-                project_id=project.id,
-                statement_update=StatementUpdate(
-                    status=StatementStatus.FAILED,
-                ),
-            )
-            await services.files.delete_file(
-                organization_id=organization_id,
-                project_id=project_id,
-                statement_id=statement.id,
-            )
+        if statement_status == StatementStatus.FAILED:
             return {"status": "error", "message": "Statement failed"}
-        await services.statements.update(
-            id=statement.id,
-            project_id=project.id,
-            statement_update=StatementUpdate(
-                status=StatementStatus.COMPLETED,
-                current_balance=current_balance,
-                previous_balance=previous_balance,
-            ),
-        )
         return {"status": "success", "message": "Statement created"}
     except ProjectNotFoundException:
         return {"status": "error", "message": "Project not found"}
     except StatementNotFoundException:
         return {"status": "error", "message": "Statement not found"}
+    except StaleProcessingTokenException:
+        return {"status": "error", "message": "Statement is processed elsewhere"}
+    except StatementBusyException:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Statement is already being processed",
+            headers={
+                "Retry-After": str(math.ceil(settings.statement_lease_ttl_seconds))
+            },
+        )
+    except ProviderUnavailableException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model provider unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
 
 
 @statements_router.get("/{statement_id}/events/status")
@@ -357,21 +348,18 @@ async def get_statement_status_event(
     project_id: PydanticObjectId,
     organization_id: OrganizationIdDep,
     request: Request,
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
 ) -> StreamingResponse:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
         statement = await services.statements.get_by_id(
-            statement_id, project_id=project.id
+            statement_id, project_id=project_id, organization_id=organization_id
         )
         return StreamingResponse(
-            services.statements.status_event(statement.id, request),
+            services.statements.status_event(
+                statement.id, request, last_event_id=last_event_id
+            ),
             media_type="text/event-stream",
-        )
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
     except StatementNotFoundException:
         raise HTTPException(
@@ -388,20 +376,16 @@ async def update_statement(
     statement_update: StatementUpdate,
 ) -> dict:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
-        )
         return await services.statements.update(
-            id=statement_id, project_id=project.id, statement_update=statement_update
+            id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
+            statement_update=statement_update,
         )
     except StatementNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found"
         )
-    except ProjectNotFoundException:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
-        )
 
 
 @statements_router.delete("/{statement_id}")
@@ -412,24 +396,51 @@ async def delete_statement(
     organization_id: OrganizationIdDep,
 ) -> dict:
     try:
-        project = await services.projects.get_by_id(
-            project_id, organization_id=organization_id
+        await services.statements.delete(
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
         )
         await services.files.delete_file(
             organization_id=organization_id,
-            project_id=str(project.id),
+            project_id=str(project_id),
             statement_id=str(statement_id),
         )
-        await services.statements.delete(
-            statement_id=statement_id,
-            project_id=project.id,
-        )
         return {"status": "success"}
     except StatementNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Statement not found"
         )
+
+
+@transactions_router.get("/search")
+async def search_transactions(
+    services: ServiceDep,
+    project_id: PydanticObjectId,
+    organization_id: OrganizationIdDep,
+    q: str = Query(..., min_length=1),
+    k: int = Query(10, ge=1, le=100),
+) -> TransactionSearchResponse:
+    try:
+        project = await services.projects.get_by_id(
+            project_id, organization_id=organization_id
+        )
+        matches = await services.statements.search_transactions(
+            project_id=project.id, organization_id=organization_id, query=q, k=k
+        )
+        return {
+            "results": [
+                {**transaction.model_dump(), "score": score}
+                for transaction, score in matches
+            ]
+        }
     except ProjectNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
         )
+    except ProviderUnavailableException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model provider unavailable",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
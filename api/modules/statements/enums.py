@@ -11,3 +11,9 @@ class StatementStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+
+
+class CountMode(str, Enum):
+    EXACT = "exact"
+    CACHED = "cached"
+    NONE = "none"
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from redis.exceptions import RedisError
+from db import redis
+from settings import settings
+
+
+StreamEntry = Tuple[str, dict]
+
+
+def parse_stream_id(stream_id: str) -> Tuple[int, int]:
+    milliseconds, _, sequence = stream_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+class StatusListener:
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.queue: asyncio.Queue[StreamEntry] = asyncio.Queue(
+            maxsize=settings.status_listener_queue_size
+        )
+        self.overflowed = False
+
+    def push(self, entry: StreamEntry) -> None:
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class StatusBroadcaster:
+    prefix = "statement_status"
+
+    def __init__(self) -> None:
+        self.listeners: Dict[str, Set[StatusListener]] = {}
+        self.cursors: Dict[str, str] = {}
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def statement_key(self, statement_id: str) -> str:
+        return f"{self.prefix}:{statement_id}"
+
+    def project_key(self, project_id: str) -> str:
+        return f"project_status:{project_id}"
+
+    async def publish(self, statement_id: str, project_id: str, payload: dict) -> str:
+        data = json.dumps({**payload, "statement_id": statement_id})
+        streams = (
+            (self.statement_key(statement_id), settings.status_stream_maxlen),
+            (self.project_key(project_id), settings.project_status_stream_maxlen),
+        )
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, maxlen in streams:
+                pipe.xadd(key, {"data": data}, maxlen=maxlen, approximate=True)
+                pipe.expire(key, settings.redis_key_ttl_seconds)
+            event_id, *_ = await pipe.execute()
+        return event_id
+
+    def _decode(self, entries: List[Tuple[str, dict]]) -> List[StreamEntry]:
+        return [(event_id, json.loads(fields["data"])) for event_id, fields in entries]
+
+    async def _read(self) -> None:
+        while self.listeners:
+            streams = dict(self.cursors)
+            if not streams:
+                self.changed.clear()
+                await self.changed.wait()
+                continue
+            try:
+                response = await redis.xread(
+                    streams, count=100, block=settings.status_stream_block_ms
+                )
+            except RedisError:
+                await asyncio.sleep(settings.status_stream_block_ms / 1000)
+                continue
+            for key, entries in response or []:
+                if key not in self.cursors:
+                    continue
+                self.cursors[key] = entries[-1][0]
+                for entry in self._decode(entries):
+                    for listener in self.listeners.get(key, ()):
+                        listener.push(entry)
+
+    def _ensure_reader(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._read())
+
+    def _register(self, listener: StatusListener) -> None:
+        self.listeners.setdefault(listener.key, set()).add(listener)
+        self._ensure_reader()
+
+    def _unregister(self, listener: StatusListener) -> None:
+        listeners = self.listeners.get(listener.key)
+        if listeners is None:
+            return
+        listeners.discard(listener)
+        if not listeners:
+            del self.listeners[listener.key]
+            self.cursors.pop(listener.key, None)
+        self.changed.set()
+
+    async def subscribe(
+        self,
+        key: str,
+        last_event_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Optional[StreamEntry]]:
+        try:
+            parse_stream_id(last_event_id or "0-0")
+        except ValueError:
+            last_event_id = None
+        listener = StatusListener(key)
+        self._register(listener)
+        try:
+            history = self._decode(
+                await redis.xrange(
+                    key, min=f"({last_event_id}" if last_event_id else "-"
+                )
+            )
+            delivered = parse_stream_id(last_event_id or "0-0")
+            if history:
+                delivered = parse_stream_id(history[-1][0])
+            if key not in self.cursors:
+                self.cursors[key] = "{}-{}".format(*delivered)
+                self.changed.set()
+            for entry in history:
+                yield entry
+            while not listener.overflowed:
+                try:
+                    entry = await asyncio.wait_for(listener.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                entry_id = parse_stream_id(entry[0])
+                if entry_id <= delivered:
+                    continue
+                delivered = entry_id
+                yield entry
+        finally:
+            self._unregister(listener)
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+status_broadcaster = StatusBroadcaster()
@@ -4,3 +4,15 @@ class StatementNotFoundException(Exception):
 
 class TransactionNotFoundException(Exception):
     pass
+
+
+class InvalidCursorException(Exception):
+    pass
+
+
+class StatementBusyException(Exception):
+    pass
+
+
+class StaleProcessingTokenException(Exception):
+    pass
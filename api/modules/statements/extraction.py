@@ -0,0 +1,76 @@
+import hashlib
+from typing import List, Optional, Tuple
+from modules.statements.schemas import StatementAiProcessing, TransactionAiProcessing
+from modules.statements.utils import normalize_description
+
+
+BALANCE_TOLERANCE = 0.01
+
+
+def transaction_key(transaction: TransactionAiProcessing) -> tuple:
+    balance = transaction.balance_after_transaction
+    return (
+        transaction.date.date(),
+        round(transaction.transaction_value, 2),
+        normalize_description(transaction.description),
+        None if balance is None else round(balance, 2),
+    )
+
+
+def tx_key(statement_id: str, index: int, transaction: TransactionAiProcessing) -> str:
+    content = hashlib.sha256(repr(transaction_key(transaction)).encode("utf-8"))
+    return f"{statement_id}:{index}:{content.hexdigest()[:16]}"
+
+
+def boundary_overlap(
+    merged: List[TransactionAiProcessing], chunk: List[TransactionAiProcessing]
+) -> int:
+    merged_keys = [
+        transaction_key(transaction) for transaction in merged[-len(chunk) :]
+    ]
+    chunk_keys = [transaction_key(transaction) for transaction in chunk]
+    for size in range(min(len(merged_keys), len(chunk_keys)), 0, -1):
+        if merged_keys[-size:] == chunk_keys[:size]:
+            return size
+    return 0
+
+
+def is_continuous(
+    previous: TransactionAiProcessing, current: TransactionAiProcessing
+) -> bool:
+    before = previous.balance_after_transaction
+    after = current.balance_after_transaction
+    if before is None or after is None:
+        return True
+    return (
+        abs(before + current.transaction_value - after) <= BALANCE_TOLERANCE
+        or abs(after + previous.transaction_value - before) <= BALANCE_TOLERANCE
+    )
+
+
+def merge_chunks(
+    results: List[StatementAiProcessing],
+) -> Tuple[StatementAiProcessing, List[int]]:
+    transactions: List[TransactionAiProcessing] = []
+    discontinuities: List[int] = []
+    for index, result in enumerate(results):
+        chunk = result.transactions
+        fresh = chunk[boundary_overlap(transactions, chunk) :]
+        if transactions and fresh and not is_continuous(transactions[-1], fresh[0]):
+            discontinuities.append(index)
+        transactions.extend(fresh)
+    previous_balance: Optional[float] = next(
+        (r.previous_balance for r in results if r.previous_balance is not None), None
+    )
+    current_balance: Optional[float] = next(
+        (r.current_balance for r in reversed(results) if r.current_balance is not None),
+        None,
+    )
+    return (
+        StatementAiProcessing(
+            previous_balance=previous_balance,
+            current_balance=current_balance,
+            transactions=transactions,
+        ),
+        discontinuities,
+    )
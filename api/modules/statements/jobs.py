@@ -0,0 +1,145 @@
+import contextlib
+from typing import Optional
+from beanie import PydanticObjectId
+from settings import settings
+from modules.files.services import FileService
+from modules.jobs.exceptions import JobDeferredException
+from modules.jobs.schemas import Job
+from modules.llm.exceptions import ProviderUnavailableException
+from modules.metrics.services import MetricsService
+from modules.projects.exceptions import ProjectNotFoundException
+from modules.projects.services import ProjectService
+from modules.statements.enums import StatementStatus
+from modules.statements.exceptions import (
+    StaleProcessingTokenException,
+    StatementBusyException,
+    StatementNotFoundException,
+)
+from modules.statements.lease import statement_leases
+from modules.statements.schemas import StatementUpdate
+from modules.statements.services import StatementService
+
+project_service = ProjectService()
+statement_service = StatementService()
+file_service = FileService()
+metrics = MetricsService()
+
+
+async def _process_statement(
+    statement_id: PydanticObjectId,
+    project_id: PydanticObjectId,
+    organization_id: str,
+) -> StatementStatus:
+    await project_service.get_by_id(project_id, organization_id=organization_id)
+    statement = await statement_service.get_by_id(
+        statement_id, project_id=project_id, organization_id=organization_id
+    )
+    if statement.status == StatementStatus.COMPLETED.value:
+        return StatementStatus.COMPLETED
+    processing_token = await statement_service.claim_processing(
+        statement.id, project_id, organization_id
+    )
+    file_content = await file_service.get_file(
+        organization_id=organization_id,
+        project_id=project_id,
+        statement_id=statement.id,
+    )
+    await statement_service.update(
+        id=statement.id,
+        project_id=project_id,
+        organization_id=organization_id,
+        statement_update=StatementUpdate(
+            status=StatementStatus.PROCESSING,
+        ),
+        processing_token=processing_token,
+    )
+    try:
+        status, current_balance, previous_balance = await statement_service.create(
+            statement=statement,
+            file_content=file_content,
+            processing_token=processing_token,
+        )
+    except ProviderUnavailableException:
+        await statement_service.update(
+            id=statement.id,
+            project_id=project_id,
+            organization_id=organization_id,
+            statement_update=StatementUpdate(status=StatementStatus.PENDING),
+            processing_token=processing_token,
+        )
+        raise
+    if status == StatementStatus.FAILED:
+        await statement_service.update(
+            id=statement.id,
+            project_id=project_id,
+            organization_id=organization_id,
+            statement_update=StatementUpdate(
+                status=StatementStatus.FAILED,
+            ),
+            processing_token=processing_token,
+        )
+        await file_service.delete_file(
+            organization_id=organization_id,
+            project_id=project_id,
+            statement_id=statement.id,
+        )
+        return status
+    await statement_service.update(
+        id=statement.id,
+        project_id=project_id,
+        organization_id=organization_id,
+        statement_update=StatementUpdate(
+            status=StatementStatus.COMPLETED,
+            current_balance=current_balance,
+            previous_balance=previous_balance,
+        ),
+        processing_token=processing_token,
+    )
+    return status
+
+
+async def process_statement(
+    statement_id: PydanticObjectId,
+    project_id: PydanticObjectId,
+    organization_id: str,
+    lease_wait_seconds: Optional[float] = None,
+) -> StatementStatus:
+    lease = await statement_leases.wait(
+        str(statement_id),
+        settings.statement_lease_wait_seconds
+        if lease_wait_seconds is None
+        else lease_wait_seconds,
+    )
+    if lease is None:
+        raise StatementBusyException
+    async with statement_leases.hold(str(statement_id), lease):
+        return await _process_statement(statement_id, project_id, organization_id)
+
+
+async def handle_process_statement(job: Job) -> None:
+    statement_id = PydanticObjectId(job.payload["statement_id"])
+    project_id = PydanticObjectId(job.payload["project_id"])
+    organization_id = job.payload["organization_id"]
+    try:
+        await process_statement(
+            statement_id, project_id, organization_id, lease_wait_seconds=0
+        )
+    except (ProjectNotFoundException, StatementNotFoundException):
+        return
+    except StaleProcessingTokenException:
+        await metrics.incr("statement_processing", "superseded_runs")
+        return
+    except StatementBusyException as e:
+        raise JobDeferredException(settings.statement_lease_ttl_seconds) from e
+    except ProviderUnavailableException as e:
+        raise JobDeferredException(e.retry_after) from e
+    except Exception:
+        if job.attempts >= settings.job_max_attempts:
+            with contextlib.suppress(Exception):
+                await statement_service.mark_failed(
+                    id=statement_id,
+                    project_id=project_id,
+                    organization_id=organization_id,
+                    error="Statement processing failed",
+                )
+        raise
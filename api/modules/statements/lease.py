@@ -0,0 +1,81 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from db import redis
+from settings import settings
+
+
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call('DEL', KEYS[1])
+"""
+
+
+class StatementLeases:
+    prefix = "statement_lease"
+
+    def __init__(self) -> None:
+        self.renew_script = redis.register_script(RENEW_SCRIPT)
+        self.release_script = redis.register_script(RELEASE_SCRIPT)
+
+    def _key(self, statement_id: str) -> str:
+        return f"{self.prefix}:{statement_id}"
+
+    async def acquire(self, statement_id: str) -> Optional[str]:
+        owner = uuid.uuid4().hex
+        acquired = await redis.set(
+            self._key(statement_id),
+            owner,
+            nx=True,
+            px=int(settings.statement_lease_ttl_seconds * 1000),
+        )
+        return owner if acquired else None
+
+    async def wait(self, statement_id: str, timeout: float) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (owner := await self.acquire(statement_id)) is None:
+            if loop.time() >= deadline:
+                return None
+            await asyncio.sleep(settings.statement_lease_poll_seconds)
+        return owner
+
+    async def renew(self, statement_id: str, owner: str) -> bool:
+        return bool(
+            await self.renew_script(
+                keys=[self._key(statement_id)],
+                args=[owner, int(settings.statement_lease_ttl_seconds * 1000)],
+            )
+        )
+
+    async def release(self, statement_id: str, owner: str) -> bool:
+        return bool(
+            await self.release_script(keys=[self._key(statement_id)], args=[owner])
+        )
+
+    @asynccontextmanager
+    async def hold(self, statement_id: str, owner: str) -> AsyncIterator[None]:
+        async def keep_alive() -> None:
+            while True:
+                await asyncio.sleep(settings.statement_lease_ttl_seconds / 3)
+                await self.renew(statement_id, owner)
+
+        renewal = asyncio.create_task(keep_alive())
+        try:
+            yield
+        finally:
+            renewal.cancel()
+            await self.release(statement_id, owner)
+
+
+statement_leases = StatementLeases()
@@ -0,0 +1,121 @@
+import functools
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+from pymongo import UpdateOne
+from db import db, redis
+from settings import settings
+from modules.projects.models import Project
+from modules.statements.models import Statement, Transaction
+from modules.statements.utils import search_tokens
+from modules.statements.vectors import encode_embedding
+
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def run_once(
+    migration: Callable[[], Awaitable[None]],
+) -> Callable[[], Awaitable[None]]:
+    name = migration.__name__
+
+    @functools.wraps(migration)
+    async def run() -> None:
+        if await db.migrations.find_one({"_id": name}, {"_id": 1}):
+            return
+        lock = f"migration:{name}"
+        if not await redis.set(
+            lock, 1, nx=True, ex=settings.migration_lock_ttl_seconds
+        ):
+            return
+        try:
+            await migration()
+            await db.migrations.update_one(
+                {"_id": name},
+                {"$set": {"completed_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+        finally:
+            await redis.delete(lock)
+
+    return run
+
+
+async def backfill_tenant_keys() -> None:
+    statements = Statement.get_pymongo_collection()
+    transactions = Transaction.get_pymongo_collection()
+    missing = {"project_id": {"$exists": False}}
+    if not await statements.find_one(missing, {"_id": 1}) and not (
+        await transactions.find_one(missing, {"_id": 1})
+    ):
+        return
+
+    async for project in Project.find_all():
+        tenant_keys = {
+            "organization_id": project.organization_id,
+            "project_id": project.id,
+        }
+        await statements.update_many(
+            {"project.$id": project.id, **missing}, {"$set": tenant_keys}
+        )
+        statement_ids = [
+            document["_id"]
+            async for document in statements.find(
+                {"project_id": project.id}, {"_id": 1}
+            )
+        ]
+        for start in range(0, len(statement_ids), BACKFILL_BATCH_SIZE):
+            await transactions.update_many(
+                {
+                    "statement.$id": {
+                        "$in": statement_ids[start : start + BACKFILL_BATCH_SIZE]
+                    },
+                    **missing,
+                },
+                {"$set": tenant_keys},
+            )
+
+
+@run_once
+async def backfill_search_tokens() -> None:
+    targets = (
+        (Statement.get_pymongo_collection(), "name"),
+        (Transaction.get_pymongo_collection(), "description"),
+    )
+    async for project in Project.find_all():
+        for collection, field in targets:
+            missing = {"project_id": project.id, "search_tokens": {"$exists": False}}
+            updates = []
+            async for document in collection.find(missing, {field: 1}):
+                updates.append(
+                    UpdateOne(
+                        {"_id": document["_id"]},
+                        {"$set": {"search_tokens": search_tokens(document[field])}},
+                    )
+                )
+                if len(updates) >= BACKFILL_BATCH_SIZE:
+                    await collection.bulk_write(updates, ordered=False)
+                    updates = []
+            if updates:
+                await collection.bulk_write(updates, ordered=False)
+
+
+@run_once
+async def migrate_embedding_storage() -> None:
+    transactions = Transaction.get_pymongo_collection()
+    legacy = {"embedding": {"$type": "array"}}
+    async for project in Project.find_all():
+        updates = []
+        async for document in transactions.find(
+            {"project_id": project.id, **legacy}, {"embedding": 1}
+        ):
+            updates.append(
+                UpdateOne(
+                    {"_id": document["_id"], **legacy},
+                    {"$set": {"embedding": encode_embedding(document["embedding"])}},
+                )
+            )
+            if len(updates) >= BACKFILL_BATCH_SIZE:
+                await transactions.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            await transactions.bulk_write(updates, ordered=False)
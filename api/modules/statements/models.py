@@ -1,22 +1,53 @@
 from typing import Optional, List
-from beanie import BackLink, Document, Link
-from pydantic import Field
+from beanie import BackLink, Document, Link, PydanticObjectId
+from bson import DBRef
+from pydantic import AliasChoices, BaseModel, Field, field_validator
+from modules.statements.vectors import StoredEmbedding
+from pymongo import IndexModel
 from datetime import datetime, timezone
 
 
 class Transaction(Document):
     statement: Link["Statement"]
+    tx_key: Optional[str] = None
+    organization_id: Optional[str] = None
+    project_id: Optional[PydanticObjectId] = None
     transaction_value: float
     description: str
     date: datetime
     transaction_type: str
     balance_after_transaction: Optional[float] = None
-    embedding: List[float]
+    embedding: StoredEmbedding
+    search_tokens: List[str] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
         name = "transactions"
+        indexes = [
+            IndexModel(
+                [
+                    ("project_id", 1),
+                    ("organization_id", 1),
+                    ("statement.$id", 1),
+                    ("date", -1),
+                    ("_id", -1),
+                ]
+            ),
+            IndexModel(
+                [
+                    ("project_id", 1),
+                    ("organization_id", 1),
+                    ("statement.$id", 1),
+                    ("search_tokens", 1),
+                ]
+            ),
+            IndexModel(
+                [("tx_key", 1)],
+                unique=True,
+                partialFilterExpression={"tx_key": {"$type": "string"}},
+            ),
+        ]
 
 
 class Statement(Document):
@@ -24,7 +55,11 @@ class Statement(Document):
     status: str
     current_balance: Optional[float] = None
     previous_balance: Optional[float] = None
+    processing_token: Optional[int] = None
+    search_tokens: List[str] = Field(default_factory=list)
     project: Link["Project"]  # noqa: F821  # pyright: ignore[reportUndefinedVariable]
+    organization_id: Optional[str] = None
+    project_id: Optional[PydanticObjectId] = None
     transactions: Optional[List[BackLink[Transaction]]] = Field(
         default=None,
         exclude=True,
@@ -35,3 +70,62 @@ class Statement(Document):
 
     class Settings:
         name = "statements"
+        indexes = [
+            IndexModel(
+                [
+                    ("project_id", 1),
+                    ("organization_id", 1),
+                    ("created_at", -1),
+                    ("_id", -1),
+                ]
+            ),
+            IndexModel(
+                [
+                    ("project_id", 1),
+                    ("organization_id", 1),
+                    ("status", 1),
+                    ("created_at", -1),
+                    ("_id", -1),
+                ]
+            ),
+            IndexModel(
+                [("project_id", 1), ("organization_id", 1), ("search_tokens", 1)]
+            ),
+        ]
+
+
+class StatementView(BaseModel):
+    id: PydanticObjectId = Field(validation_alias=AliasChoices("_id", "id"))
+    name: str
+    status: str
+    current_balance: Optional[float] = None
+    previous_balance: Optional[float] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Settings:
+        projection = {"search_tokens": 0, "processing_token": 0}
+
+
+class TransactionView(BaseModel):
+    id: PydanticObjectId = Field(validation_alias=AliasChoices("_id", "id"))
+    statement_id: PydanticObjectId = Field(
+        validation_alias=AliasChoices("statement", "statement_id")
+    )
+    transaction_value: float
+    description: str
+    date: datetime
+    transaction_type: str
+    balance_after_transaction: Optional[float] = None
+    created_at: datetime
+    updated_at: datetime
+
+    @field_validator("statement_id", mode="before")
+    @classmethod
+    def statement_reference(cls, value):
+        if isinstance(value, DBRef):
+            return value.id
+        return value
+
+    class Settings:
+        projection = {"embedding": 0, "search_tokens": 0, "tx_key": 0}
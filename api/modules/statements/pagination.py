@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+from modules.statements.exceptions import InvalidCursorException
+
+
+Cursor = Tuple[datetime, PydanticObjectId, Optional[int]]
+
+
+def encode_cursor(
+    value: datetime, id: PydanticObjectId, score: Optional[int] = None
+) -> str:
+    payload = {"v": value.isoformat(), "id": str(id)}
+    if score is not None:
+        payload["s"] = score
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        score = payload.get("s")
+        return (
+            datetime.fromisoformat(payload["v"]),
+            PydanticObjectId(payload["id"]),
+            None if score is None else int(score),
+        )
+    except (ValueError, TypeError, KeyError, AttributeError, InvalidId) as e:
+        raise InvalidCursorException from e
+
+
+def keyset_filter(field: str, cursor: str) -> dict:
+    value, id, _ = decode_cursor(cursor)
+    return {
+        field: {"$lte": value},
+        "$or": [{field: {"$lt": value}}, {"_id": {"$lt": id}}],
+    }
+
+
+def ranked_keyset_filter(field: str, score_field: str, cursor: str) -> dict:
+    value, id, score = decode_cursor(cursor)
+    if score is None:
+        raise InvalidCursorException
+    return {
+        "$or": [
+            {score_field: {"$lt": score}},
+            {score_field: score, field: {"$lt": value}},
+            {score_field: score, field: value, "_id": {"$lt": id}},
+        ]
+    }
+
+
+def next_cursor(
+    field: str,
+    documents: List[dict],
+    limit: int,
+    score_field: Optional[str] = None,
+) -> Optional[str]:
+    if len(documents) <= limit:
+        return None
+    last = documents[limit - 1]
+    return encode_cursor(
+        last[field], last["_id"], last[score_field] if score_field else None
+    )
@@ -0,0 +1,77 @@
+import re
+from io import BytesIO
+from typing import List, NamedTuple, Optional, Tuple
+from pypdf import PdfReader, PdfWriter
+from pypdf.errors import PyPdfError
+
+
+PageRange = Tuple[int, int]
+
+TRAILING_SPACE_PATTERN = re.compile(r"[ \t]+$", re.MULTILINE)
+COLUMN_GAP_PATTERN = re.compile(r"[ \t]{3,}")
+BLANK_LINES_PATTERN = re.compile(r"\n{2,}")
+
+
+class PdfChunk(NamedTuple):
+    pages: PageRange
+    content: Optional[bytes]
+    text: Optional[str]
+
+
+def page_ranges(page_count: int, pages_per_chunk: int, overlap: int) -> List[PageRange]:
+    step = max(1, pages_per_chunk - overlap)
+    ranges = []
+    for start in range(0, page_count, step):
+        end = min(start + pages_per_chunk, page_count)
+        ranges.append((start, end))
+        if end == page_count:
+            break
+    return ranges
+
+
+def compact_text(text: str) -> str:
+    text = TRAILING_SPACE_PATTERN.sub("", text)
+    text = COLUMN_GAP_PATTERN.sub("  ", text)
+    return BLANK_LINES_PATTERN.sub("\n", text).strip()
+
+
+def has_text_layer(text: str, min_chars: int) -> bool:
+    characters = [char for char in text if not char.isspace()]
+    if len(characters) < min_chars or "(cid:" in text:
+        return False
+    readable = sum(char.isalnum() for char in characters)
+    return readable / len(characters) >= 0.5
+
+
+def page_text(reader: PdfReader, index: int) -> str:
+    try:
+        return compact_text(reader.pages[index].extract_text(extraction_mode="layout"))
+    except (PyPdfError, ValueError, KeyError):
+        return ""
+
+
+def split_pdf(
+    file_content: bytes,
+    pages_per_chunk: int,
+    overlap: int = 0,
+    min_text_chars: int = 0,
+) -> Tuple[int, List[PdfChunk]]:
+    reader = PdfReader(BytesIO(file_content))
+    page_count = len(reader.pages)
+    texts = [page_text(reader, index) for index in range(page_count)]
+    ranges = page_ranges(page_count, pages_per_chunk, overlap) or [(0, page_count)]
+    chunks = []
+    for start, end in ranges:
+        text = "\n\n".join(texts[start:end])
+        if end > start and has_text_layer(text, min_text_chars * (end - start)):
+            chunks.append(PdfChunk((start, end), None, text))
+        elif len(ranges) == 1:
+            chunks.append(PdfChunk((start, end), file_content, None))
+        else:
+            writer = PdfWriter()
+            for page in reader.pages[start:end]:
+                writer.add_page(page)
+            buffer = BytesIO()
+            writer.write(buffer)
+            chunks.append(PdfChunk((start, end), buffer.getvalue(), None))
+    return page_count, chunks
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field, field_validator
 from beanie import PydanticObjectId
 from datetime import datetime
 from modules.statements.enums import StatementStatus, TransactionType
+from modules.statements.vectors import PackedEmbedding
 
 
 class TransactionResponse(BaseModel):
@@ -16,6 +17,15 @@ class TransactionResponse(BaseModel):
     updated_at: datetime
 
 
+class TransactionSearchResult(TransactionResponse):
+    statement_id: PydanticObjectId
+    score: float
+
+
+class TransactionSearchResponse(BaseModel):
+    results: List[TransactionSearchResult]
+
+
 class TransactionCreate(BaseModel):
     transaction_value: float
     description: str
@@ -109,11 +119,28 @@ class TransactionEmbedding(BaseModel):
     description: str
 
 
+class IndexedTransactionEmbedding(TransactionEmbedding):
+    index: int
+
+
+class TransactionEmbeddingBatch(BaseModel):
+    descriptions: List[IndexedTransactionEmbedding]
+
+
+class TransactionEnrichment(BaseModel):
+    description: str
+    embedding: PackedEmbedding
+
+
 class TransactionsPaginatedResponse(BaseModel):
     transactions: List[TransactionResponse]
-    total: int
+    total: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 class StatementsPaginatedResponse(BaseModel):
     statements: List[StatementResponse]
-    total: int
+    total: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
@@ -1,396 +1,1146 @@
 import base64
 import asyncio
-from beanie import PydanticObjectId
-from beanie.operators import And
+import logging
+import numpy as np
+from beanie import Document, PydanticObjectId, UpdateResponse
+from beanie.operators import And, In
 from fastapi import Request
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableLambda
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import PydanticOutputParser
 from qstash.message import FlowControl
 from modules.statements.exceptions import (
+    StaleProcessingTokenException,
     StatementNotFoundException,
     TransactionNotFoundException,
 )
-from modules.statements.models import Statement
+from modules.statements.pagination import (
+    keyset_filter,
+    next_cursor,
+    ranked_keyset_filter,
+)
+from modules.statements.utils import search_query, search_tokens
+from modules.statements.models import Statement, StatementView, TransactionView
 from modules.statements.schemas import (
     StatementAiProcessing,
     StatementUpdate,
     TransactionCreate,
 )
 from modules.statements.constant import (
+    DUPLICATE_KEY_ERROR,
+    PROCESS_STATEMENT_JOB,
+    STATEMENT_CHUNK_PROMPT,
+    STATEMENT_DOCUMENT_PROMPT,
     STATEMENT_PROCESSING_SYSTEM_PROMPT,
     STATEMENT_PROCESSING_HUMAN_PROMPT,
+    STATEMENT_TEXT_PROMPT,
+    TRANSACTION_BATCH_EMBEDDING_PROMPT,
     TRANSACTION_EMBEDDING_PROMPT,
 )
 from modules.statements.llms import (
     statement_processing_model,
     transaction_embedding_model,
 )
-from modules.statements.enums import StatementStatus
+from modules.statements.enums import CountMode, StatementStatus
+from modules.statements.cache import (
+    listing_count_cache,
+    statement_extraction_cache,
+    transaction_enrichment_cache,
+)
 import json
-from db import redis
 from settings import settings
 from typing import Optional
 from modules.projects.models import Project
-from modules.statements.schemas import TransactionAiProcessing, TransactionEmbedding
+from modules.statements.schemas import (
+    TransactionAiProcessing,
+    TransactionEmbedding,
+    TransactionEmbeddingBatch,
+    TransactionEnrichment,
+)
 from modules.statements.models import Transaction
-from typing import List
+from modules.statements.vector_index import vector_indexes
+from modules.statements.vectors import decode_embedding, encode_embedding
+from modules.statements.extraction import merge_chunks, tx_key
+from modules.statements.pdf import PdfChunk, split_pdf
+from modules.metrics.services import MetricsService
+from modules.jobs.enums import JobPriority
+from modules.jobs.queue import job_queue
+from modules.llm.exceptions import ProviderUnavailableException
+from modules.llm.gateway import PDF_PAGE_TOKENS, estimate_tokens, llm_gateway
+from modules.statements.events import parse_stream_id, status_broadcaster
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Type
 from modules.statements.llms import embeddings
-from db import qstash
+from db import client, qstash, transactions_supported
+from beanie.odm.utils.dump import get_dict
+from pymongo import DESCENDING, ReturnDocument, UpdateOne
+from pymongo.asynchronous.client_session import AsyncClientSession
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timezone
 from modules.statements.enums import TransactionType
-import re
+
+
+statement_processing_chain = (
+    ChatPromptTemplate.from_messages(
+        [
+            ("system", STATEMENT_PROCESSING_SYSTEM_PROMPT),
+            (
+                "human",
+                [
+                    {"type": "text", "text": STATEMENT_PROCESSING_HUMAN_PROMPT},
+                    {"type": "text", "text": "{chunk_hint}"},
+                    {
+                        "type": "media",
+                        "mime_type": "application/pdf",
+                        "data": "{file}",
+                    },
+                ],
+            ),
+        ]
+    )
+    | statement_processing_model
+    | PydanticOutputParser(pydantic_object=StatementAiProcessing)
+)
+
+statement_text_processing_chain = (
+    ChatPromptTemplate.from_messages(
+        [
+            ("system", STATEMENT_PROCESSING_SYSTEM_PROMPT),
+            (
+                "human",
+                [
+                    {"type": "text", "text": STATEMENT_PROCESSING_HUMAN_PROMPT},
+                    {"type": "text", "text": "{chunk_hint}"},
+                    {"type": "text", "text": STATEMENT_TEXT_PROMPT},
+                ],
+            ),
+        ]
+    )
+    | statement_processing_model
+    | PydanticOutputParser(pydantic_object=StatementAiProcessing)
+)
+
+transaction_embedding_chain = (
+    ChatPromptTemplate.from_template(TRANSACTION_EMBEDDING_PROMPT)
+    | transaction_embedding_model
+    | PydanticOutputParser(pydantic_object=TransactionEmbedding)
+)
+
+transaction_batch_embedding_chain = (
+    ChatPromptTemplate.from_template(TRANSACTION_BATCH_EMBEDDING_PROMPT)
+    | transaction_embedding_model
+    | PydanticOutputParser(pydantic_object=TransactionEmbeddingBatch)
+)
+
+metrics = MetricsService()
+logger = logging.getLogger(__name__)
 
 
 class StatementService:
-    async def create_statement_in_db(
+    async def create_statements_in_db(
         self,
-        name: str,
-        status: StatementStatus,
         project: Project,
-        error: Optional[str] = None,
-    ) -> Statement:
-        new_statement = Statement(
-            name=name,
-            status=status.value,
-            project=project,
+        statements: List[tuple[str, Optional[str]]],
+    ) -> List[Statement]:
+        new_statements = [
+            Statement(
+                id=PydanticObjectId(),
+                name=name,
+                search_tokens=search_tokens(name),
+                status=(
+                    StatementStatus.FAILED if error else StatementStatus.PENDING
+                ).value,
+                project=project,
+                organization_id=project.organization_id,
+                project_id=project.id,
+            )
+            for name, error in statements
+        ]
+        await Statement.insert_many(new_statements)
+        await listing_count_cache.invalidate(project.id)
+        failed = [
+            (statement, error)
+            for statement, (_, error) in zip(new_statements, statements)
+            if error
+        ]
+        for statement, error in failed:
+            await status_broadcaster.publish(
+                str(statement.id),
+                str(project.id),
+                {"status": StatementStatus.FAILED.value, "error": error},
+            )
+        return new_statements
+
+    def _transaction_type_es(self, transaction_type: TransactionType | str) -> str:
+        if isinstance(transaction_type, TransactionType):
+            is_expense = transaction_type == TransactionType.EXPENSE
+        else:
+            tx_str = str(transaction_type).lower()
+            is_expense = tx_str in ("expense", "transactiontype.expense")
+        return "gasto" if is_expense else "ingreso"
+
+    async def _rewrite_description(
+        self,
+        transaction: TransactionAiProcessing | TransactionCreate,
+        semaphore: asyncio.Semaphore,
+    ) -> str:
+        inputs = {
+            "tx_type": self._transaction_type_es(transaction.transaction_type),
+            "description": transaction.description,
+        }
+        async with semaphore:
+            transaction_description = await llm_gateway.invoke(
+                transaction_embedding_model.model_name,
+                lambda: transaction_embedding_chain.ainvoke(inputs),
+                tokens=estimate_tokens(
+                    TRANSACTION_EMBEDDING_PROMPT,
+                    transaction.description,
+                    transaction.description,
+                ),
+            )
+        return transaction_description.description
+
+    async def _rewrite_batch(
+        self,
+        transactions: List[TransactionAiProcessing | TransactionCreate],
+        indices: List[int],
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[int, str]:
+        payload = json.dumps(
+            [
+                {
+                    "index": index,
+                    "type": self._transaction_type_es(
+                        transactions[index].transaction_type
+                    ),
+                    "description": transactions[index].description,
+                }
+                for index in indices
+            ],
+            ensure_ascii=False,
         )
-        await new_statement.create()
-        if status == StatementStatus.FAILED:
-            await redis.rpush(
-                f"statement_processing:{str(new_statement.id)}",
-                json.dumps({"status": StatementStatus.FAILED.value}),
-                error=error,
+        await metrics.incr("transaction_rewrite", "batch_calls")
+        try:
+            async with semaphore:
+                batch = await llm_gateway.invoke(
+                    transaction_embedding_model.model_name,
+                    lambda: transaction_batch_embedding_chain.ainvoke(
+                        {"transactions": payload}
+                    ),
+                    tokens=estimate_tokens(
+                        TRANSACTION_BATCH_EMBEDDING_PROMPT, payload, payload
+                    ),
+                )
+        except OutputParserException:
+            await metrics.incr("transaction_rewrite", "invalid_batches")
+            return {}
+        requested = set(indices)
+        descriptions: Dict[int, str] = {}
+        for item in batch.descriptions:
+            description = item.description.strip()
+            if item.index in requested and description:
+                descriptions.setdefault(item.index, description)
+        if [item.index for item in batch.descriptions] != indices:
+            await metrics.incr("transaction_rewrite", "misaligned_batches")
+        return descriptions
+
+    async def _rewrite_descriptions(
+        self,
+        transactions: List[TransactionAiProcessing | TransactionCreate],
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    ) -> List[str]:
+        semaphore = asyncio.Semaphore(settings.transaction_enrichment_concurrency)
+        batch_size = settings.transaction_rewrite_batch_size
+        descriptions: Dict[int, str] = {}
+        missing = list(range(len(transactions)))
+
+        async def rewrite(indices: List[int]) -> None:
+            descriptions.update(
+                await self._rewrite_batch(transactions, indices, semaphore)
             )
-            redis.expire(
-                f"statement_processing:{str(new_statement.id)}",
-                settings.redis_key_ttl_seconds,
+            if on_progress:
+                await on_progress(len(descriptions), len(transactions))
+
+        for attempt in range(settings.transaction_rewrite_attempts):
+            if not missing:
+                break
+            if attempt:
+                await metrics.incr("transaction_rewrite", "rerequested", len(missing))
+            await asyncio.gather(
+                *(
+                    rewrite(missing[start : start + batch_size])
+                    for start in range(0, len(missing), batch_size)
+                )
+            )
+            missing = [index for index in missing if index not in descriptions]
+        if missing:
+            await metrics.incr("transaction_rewrite", "single_fallbacks", len(missing))
+            fallback = await asyncio.gather(
+                *(
+                    self._rewrite_description(transactions[index], semaphore)
+                    for index in missing
+                )
             )
-        return new_statement
+            descriptions.update(zip(missing, fallback))
+        return [descriptions[index] for index in range(len(transactions))]
+
+    async def _embed_descriptions(self, descriptions: List[str]) -> List[List[float]]:
+        batch_size = settings.embedding_batch_size
+
+        async def embed(batch: List[str]) -> List[List[float]]:
+            return await llm_gateway.invoke(
+                embeddings.model,
+                lambda: embeddings.aembed_documents(batch),
+                tokens=estimate_tokens(*batch),
+            )
+
+        batches = await asyncio.gather(
+            *(
+                embed(descriptions[start : start + batch_size])
+                for start in range(0, len(descriptions), batch_size)
+            )
+        )
+        return [embedding for batch in batches for embedding in batch]
+
+    async def _embed_transactions(
+        self,
+        transactions: List[TransactionAiProcessing] | List[TransactionCreate],
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    ) -> List[np.ndarray]:
+        keys = [
+            transaction_enrichment_cache.key(
+                transaction.transaction_type, transaction.description
+            )
+            for transaction in transactions
+        ]
+        enrichments = await transaction_enrichment_cache.get_many(keys)
+        pending = {
+            key: transaction
+            for key, transaction in zip(keys, transactions)
+            if key not in enrichments
+        }
+        if pending:
+            descriptions = await self._rewrite_descriptions(
+                list(pending.values()), on_progress=on_progress
+            )
+            fresh = {
+                key: TransactionEnrichment(description=description, embedding=embedding)
+                for key, description, embedding in zip(
+                    pending, descriptions, await self._embed_descriptions(descriptions)
+                )
+            }
+            await transaction_enrichment_cache.set_many(fresh)
+            enrichments.update(fresh)
+        return [enrichments[key].embedding for key in keys]
 
     async def _create_transactions_in_db(
         self,
         statement: Statement,
         transactions: List[TransactionAiProcessing],
+        processing_token: int,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
     ) -> None:
-        for transaction in transactions:
-            transaction_embedding_prompt = ChatPromptTemplate.from_template(
-                TRANSACTION_EMBEDDING_PROMPT
+        if not transactions:
+            return
+        transaction_embeddings = await self._embed_transactions(
+            transactions, on_progress=on_progress
+        )
+        new_transactions = [
+            Transaction(
+                id=PydanticObjectId(),
+                statement=statement,
+                tx_key=tx_key(str(statement.id), index, transaction),
+                organization_id=statement.organization_id,
+                project_id=statement.project_id,
+                **transaction.model_dump(),
+                search_tokens=search_tokens(transaction.description),
+                embedding=embedding,
+            )
+            for index, (transaction, embedding) in enumerate(
+                zip(transactions, transaction_embeddings)
             )
-            transaction_embedding_chain = (
-                transaction_embedding_prompt
-                | transaction_embedding_model
-                | PydanticOutputParser(pydantic_object=TransactionEmbedding)
+        ]
+        operations = [
+            UpdateOne(
+                {"tx_key": transaction.tx_key},
+                {"$setOnInsert": get_dict(transaction, to_db=True)},
+                upsert=True,
             )
+            for transaction in new_transactions
+        ]
 
-            tx_type_raw = transaction.transaction_type
-            if isinstance(tx_type_raw, TransactionType):
-                is_expense = tx_type_raw == TransactionType.EXPENSE
-            else:
-                tx_str = str(tx_type_raw).lower()
-                is_expense = tx_str in ("expense", "transactiontype.expense")
-            tx_type_es = "gasto" if is_expense else "ingreso"
+        async def write(
+            session: Optional[AsyncClientSession] = None,
+        ) -> Dict[int, object]:
+            fenced = await Statement.get_pymongo_collection().update_one(
+                {"_id": statement.id, "processing_token": processing_token},
+                {"$set": {"updated_at": datetime.now(timezone.utc)}},
+                session=session,
+            )
+            if not fenced.matched_count:
+                raise StaleProcessingTokenException
+            try:
+                result = await Transaction.get_pymongo_collection().bulk_write(
+                    operations, ordered=False, session=session
+                )
+            except BulkWriteError as e:
+                if session is not None or any(
+                    error["code"] != DUPLICATE_KEY_ERROR
+                    for error in e.details["writeErrors"]
+                ):
+                    raise
+                return {item["index"]: item["_id"] for item in e.details["upserted"]}
+            return result.upserted_ids
+
+        if await transactions_supported():
+            async with client.start_session() as session:
+                upserted = await session.with_transaction(write)
+        else:
+            upserted = await write()
+        if not upserted:
+            return
+        await listing_count_cache.invalidate(statement.project_id)
+        await vector_indexes.add(
+            statement.project_id,
+            [PydanticObjectId(id) for id in upserted.values()],
+            [decode_embedding(new_transactions[index].embedding) for index in upserted],
+        )
 
-            transaction_description = await transaction_embedding_chain.ainvoke(
+    async def claim_processing(
+        self,
+        id: PydanticObjectId,
+        project_id: PydanticObjectId,
+        organization_id: str,
+    ) -> int:
+        statement = await Statement.get_pymongo_collection().find_one_and_update(
+            {"_id": id, "project_id": project_id, "organization_id": organization_id},
+            [
                 {
-                    "tx_type": tx_type_es,
-                    "amount": transaction.transaction_value,
-                    "description": transaction.description,
+                    "$set": {
+                        "processing_token": {
+                            "$add": [{"$ifNull": ["$processing_token", 0]}, 1]
+                        }
+                    }
                 }
-            )
-            embedding = embeddings.embed_query(transaction_description.description)
-            new_transaction = Transaction(
-                statement=statement,
-                **transaction.model_dump(),
-                embedding=embedding,
-            )
-            await new_transaction.create()
+            ],
+            projection={"processing_token": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if statement is None:
+            raise StatementNotFoundException
+        return statement["processing_token"]
+
+    async def _extract_chunk(
+        self, chunk: PdfChunk, chunk_hint: str
+    ) -> StatementAiProcessing:
+        prompt_tokens = estimate_tokens(
+            STATEMENT_PROCESSING_SYSTEM_PROMPT,
+            STATEMENT_PROCESSING_HUMAN_PROMPT,
+            chunk_hint,
+        )
+        if chunk.text is not None:
+            chain = statement_text_processing_chain
+            inputs = {"text": chunk.text, "chunk_hint": chunk_hint}
+            tokens = prompt_tokens + 2 * estimate_tokens(chunk.text)
+        else:
+            chain = statement_processing_chain
+            inputs = {
+                "file": base64.b64encode(chunk.content).decode("utf-8"),
+                "chunk_hint": chunk_hint,
+            }
+            start, end = chunk.pages
+            tokens = prompt_tokens + 2 * PDF_PAGE_TOKENS * max(1, end - start)
+        attempts = settings.statement_chunk_attempts
+        for attempt in range(attempts):
+            try:
+                return await llm_gateway.invoke(
+                    statement_processing_model.model,
+                    lambda: chain.ainvoke(inputs),
+                    tokens=tokens,
+                )
+            except OutputParserException:
+                if attempt == attempts - 1:
+                    raise
+                await metrics.incr("statement_extraction", "chunk_retries")
+                await asyncio.sleep(
+                    settings.statement_chunk_retry_backoff_seconds * 2**attempt
+                )
 
     async def _ai_statement_processing(
-        self, file_content: bytes
+        self,
+        file_content: bytes,
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
     ) -> StatementAiProcessing:
-        statement_processing_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", STATEMENT_PROCESSING_SYSTEM_PROMPT),
-                (
-                    "human",
-                    [
-                        {"type": "text", "text": STATEMENT_PROCESSING_HUMAN_PROMPT},
-                        {
-                            "type": "media",
-                            "mime_type": "application/pdf",
-                            "data": "{file}",
-                        },
-                    ],
-                ),
-            ]
+        cached = await statement_extraction_cache.get(file_content)
+        if cached is not None:
+            return cached
+        try:
+            page_count, chunks = await asyncio.to_thread(
+                split_pdf,
+                file_content,
+                settings.statement_chunk_pages,
+                settings.statement_chunk_overlap_pages,
+                settings.statement_text_min_chars_per_page,
+            )
+        except Exception:
+            logger.warning("Could not split statement PDF", exc_info=True)
+            page_count, chunks = 0, [PdfChunk((0, 0), file_content, None)]
+        text_chunks = sum(chunk.text is not None for chunk in chunks)
+        await metrics.incr_many(
+            "statement_extraction",
+            {"text_chunks": text_chunks, "media_chunks": len(chunks) - text_chunks},
         )
-        statement_processing_chain = (
-            RunnableLambda(lambda x: {"file": base64.b64encode(x).decode("utf-8")})
-            | statement_processing_prompt
-            | statement_processing_model
-            | PydanticOutputParser(pydantic_object=StatementAiProcessing)
+        hints = [
+            STATEMENT_CHUNK_PROMPT.format(
+                first_page=start + 1, last_page=end, page_count=page_count
+            )
+            if len(chunks) > 1
+            else STATEMENT_DOCUMENT_PROMPT
+            for (start, end), _, _ in chunks
+        ]
+        semaphore = asyncio.Semaphore(settings.statement_chunk_concurrency)
+        processed = 0
+
+        async def extract(index: int) -> StatementAiProcessing:
+            async with semaphore:
+                return await self._extract_chunk(chunks[index], hints[index])
+
+        async def extract_with_progress(index: int) -> StatementAiProcessing:
+            nonlocal processed
+            result = await extract(index)
+            processed += 1
+            if on_progress is not None:
+                await on_progress(processed, len(chunks))
+            return result
+
+        results = list(
+            await asyncio.gather(*map(extract_with_progress, range(len(chunks))))
         )
-        return await statement_processing_chain.ainvoke(file_content)
+        statement_ai_processing, discontinuities = merge_chunks(results)
+        if discontinuities:
+            retried = await asyncio.gather(*map(extract, discontinuities))
+            for index, result in zip(discontinuities, retried):
+                results[index] = result
+            statement_ai_processing, discontinuities = merge_chunks(results)
+        if discontinuities:
+            await metrics.incr(
+                "statement_extraction",
+                "balance_discontinuities",
+                len(discontinuities),
+            )
+        else:
+            await statement_extraction_cache.set(file_content, statement_ai_processing)
+        return statement_ai_processing
 
     async def create(
         self,
         statement: Statement,
         file_content: bytes,
+        processing_token: int,
     ) -> tuple[StatementStatus, Optional[float], Optional[float]]:
+        statement_id = str(statement.id)
+        project_id = str(statement.project_id)
+
+        async def publish(status: StatementStatus, **data) -> None:
+            await status_broadcaster.publish(
+                statement_id, project_id, {"status": status.value, **data}
+            )
+
+        def progress_reporter(
+            stage: str,
+        ) -> Callable[[int, int], Awaitable[None]]:
+            async def report_progress(processed: int, total: int) -> None:
+                await publish(
+                    StatementStatus.PROCESSING,
+                    progress={"stage": stage, "processed": processed, "total": total},
+                )
+
+            return report_progress
+
         try:
-            key = f"statement_processing:{str(statement.id)}"
-            await redis.rpush(
-                key, json.dumps({"status": StatementStatus.PROCESSING.value})
+            await publish(StatementStatus.PROCESSING, progress={"stage": "extracting"})
+            statement_ai_processing = await self._ai_statement_processing(
+                file_content, on_progress=progress_reporter("extracting")
             )
-            await redis.expire(key, settings.redis_key_ttl_seconds)
-            statement_ai_processing = await self._ai_statement_processing(file_content)
             await self._create_transactions_in_db(
                 statement=statement,
                 transactions=statement_ai_processing.transactions,
+                processing_token=processing_token,
+                on_progress=progress_reporter("enriching"),
             )
-            await redis.rpush(
-                key, json.dumps({"status": StatementStatus.COMPLETED.value})
-            )
-            await redis.expire(key, settings.redis_key_ttl_seconds)
+            await publish(StatementStatus.COMPLETED)
             return (
                 StatementStatus.COMPLETED,
                 statement_ai_processing.current_balance,
                 statement_ai_processing.previous_balance,
             )
-        except ValueError as e:
-            await redis.rpush(
-                key,
-                json.dumps(
-                    {
-                        "status": StatementStatus.FAILED.value,
-                        "error": "Invalid statement data",
-                    }
-                ),
-            )
-            await redis.expire(key, settings.redis_key_ttl_seconds)
-            print(e)
+        except ProviderUnavailableException:
+            await publish(StatementStatus.PENDING)
+            raise
+        except StaleProcessingTokenException:
+            raise
+        except ValueError:
+            logger.exception("Invalid data extracted from statement %s", statement_id)
+            await publish(StatementStatus.FAILED, error="Invalid statement data")
             return StatementStatus.FAILED, None, None
         except Exception as e:
-            await redis.rpush(
-                key,
-                json.dumps({"status": StatementStatus.FAILED.value, "error": str(e)}),
-            )
-            await redis.expire(key, settings.redis_key_ttl_seconds)
+            logger.exception("Failed to process statement %s", statement_id)
+            await publish(StatementStatus.FAILED, error=str(e))
             return StatementStatus.FAILED, None, None
 
     async def get_by_id(
-        self, statement_id: PydanticObjectId, project_id: PydanticObjectId
+        self,
+        statement_id: PydanticObjectId,
+        project_id: PydanticObjectId,
+        organization_id: str,
     ) -> Statement:
         statement = await Statement.find_one(
             And(
+                Statement.organization_id == organization_id,
+                Statement.project_id == project_id,
                 Statement.id == statement_id,
-                Statement.project.id == project_id,
             )
         )
         if not statement:
             raise StatementNotFoundException
         return statement
 
+    async def _paginate(
+        self,
+        document: Type[Statement] | Type[Transaction],
+        view: Type[StatementView] | Type[TransactionView],
+        filters: list,
+        sort_field: str,
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+        count: CountMode,
+        project_id: PydanticObjectId,
+        count_scope: list,
+        search: Optional[str] = None,
+    ) -> tuple[list, Optional[int], Optional[str]]:
+        total = None
+        count_key = None
+        if count == CountMode.CACHED:
+            count_key = await listing_count_cache.key(project_id, count_scope)
+            total = await listing_count_cache.get(count_key)
+        needs_total = count != CountMode.NONE and total is None
+
+        exact_terms: List[str] = []
+        if search:
+            prefixes, exact_terms = search_query(search)
+            if prefixes:
+                filters = [*filters, {"search_tokens": {"$all": prefixes}}]
+
+        page_filters = list(filters)
+        stages: List[dict] = []
+        sort = {sort_field: DESCENDING, "_id": DESCENDING}
+        if exact_terms:
+            stages.append(
+                {
+                    "$addFields": {
+                        "search_score": {
+                            "$size": {
+                                "$setIntersection": ["$search_tokens", exact_terms]
+                            }
+                        }
+                    }
+                }
+            )
+            sort = {"search_score": DESCENDING, **sort}
+            if cursor:
+                stages.append(
+                    {"$match": ranked_keyset_filter(sort_field, "search_score", cursor)}
+                )
+        elif cursor:
+            page_filters.append(keyset_filter(sort_field, cursor))
+        stages.append({"$sort": sort})
+        page = [
+            {"$skip": 0 if cursor else offset},
+            {"$limit": limit + 1},
+            {"$project": view.Settings.projection},
+        ]
+
+        query = document.find(And(*page_filters)).aggregate([*stages, *page]).to_list()
+        if needs_total:
+            raw_documents, total = await asyncio.gather(
+                query, document.find(And(*filters)).count()
+            )
+        else:
+            raw_documents = await query
+
+        if count_key is not None and needs_total:
+            await listing_count_cache.set(count_key, total)
+        return (
+            [view.model_validate(raw) for raw in raw_documents[:limit]],
+            total,
+            next_cursor(
+                sort_field,
+                raw_documents,
+                limit,
+                score_field="search_score" if exact_terms else None,
+            ),
+        )
+
     async def list_paginated(
         self,
         project_id: PydanticObjectId,
+        organization_id: str,
         limit: int = 10,
         offset: int = 0,
         search: Optional[str] = None,
         status: Optional[StatementStatus] = None,
-    ) -> tuple[List[Statement], int]:
-        filters = [Statement.project.id == project_id]
-        if search:
-            pattern = re.compile(re.escape(search), re.IGNORECASE)
-            filters.append(Statement.name == pattern)
+        cursor: Optional[str] = None,
+        count: CountMode = CountMode.EXACT,
+    ) -> tuple[List[StatementView], Optional[int], Optional[str]]:
+        filters = [
+            Statement.organization_id == organization_id,
+            Statement.project_id == project_id,
+        ]
         if status:
             filters.append(Statement.status == status.value)
 
-        query = Statement.find(And(*filters))
-        total = await query.count()
-        statements = (
-            await query.sort(-Statement.created_at).skip(offset).limit(limit).to_list()
+        return await self._paginate(
+            Statement,
+            StatementView,
+            filters,
+            sort_field="created_at",
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            count=count,
+            project_id=project_id,
+            count_scope=["statements", organization_id, search, status],
+            search=search,
         )
-        return statements, total
 
     async def list_transactions_paginated(
         self,
         statement_id: PydanticObjectId,
         project_id: PydanticObjectId,
+        organization_id: str,
         limit: int = 10,
         offset: int = 0,
         search: Optional[str] = None,
-    ) -> tuple[List[Transaction], int]:
+        cursor: Optional[str] = None,
+        count: CountMode = CountMode.EXACT,
+    ) -> tuple[List[TransactionView], Optional[int], Optional[str]]:
         statement = await self.get_by_id(
-            statement_id=statement_id, project_id=project_id
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
         )
 
-        filters = [Transaction.statement.id == statement.id]
-        if search:
-            pattern = re.compile(re.escape(search), re.IGNORECASE)
-            filters.append(Transaction.description == pattern)
+        filters = [
+            Transaction.organization_id == organization_id,
+            Transaction.project_id == project_id,
+            Transaction.statement.id == statement.id,
+        ]
 
-        tx_query = Transaction.find(And(*filters))
-        total = await tx_query.count()
-        transactions = (
-            await tx_query.sort(-Transaction.date).skip(offset).limit(limit).to_list()
+        return await self._paginate(
+            Transaction,
+            TransactionView,
+            filters,
+            sort_field="date",
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            count=count,
+            project_id=project_id,
+            count_scope=["transactions", organization_id, statement.id, search],
+            search=search,
+        )
+
+    def _transaction_filter(
+        self,
+        transaction_id: PydanticObjectId,
+        statement_id: PydanticObjectId,
+        project_id: PydanticObjectId,
+        organization_id: str,
+    ):
+        return And(
+            Transaction.organization_id == organization_id,
+            Transaction.project_id == project_id,
+            Transaction.statement.id == statement_id,
+            Transaction.id == transaction_id,
         )
-        return transactions, total
 
     async def get_transaction_by_id(
         self,
         transaction_id: PydanticObjectId,
+        statement_id: PydanticObjectId,
         project_id: PydanticObjectId,
-    ) -> Transaction:
-        transaction = await Transaction.get(transaction_id)
+        organization_id: str,
+    ) -> TransactionView:
+        transaction = await Transaction.find_one(
+            self._transaction_filter(
+                transaction_id, statement_id, project_id, organization_id
+            )
+        ).project(TransactionView)
         if not transaction:
             raise TransactionNotFoundException
-        await self.get_by_id(
-            statement_id=transaction.statement.id, project_id=project_id
-        )
         return transaction
 
+    async def search_transactions(
+        self,
+        project_id: PydanticObjectId,
+        organization_id: str,
+        query: str,
+        k: int = 10,
+    ) -> List[tuple[TransactionView, float]]:
+        query_embedding = await llm_gateway.invoke(
+            embeddings.model,
+            lambda: embeddings.aembed_query(query),
+            tokens=estimate_tokens(query),
+        )
+        matches = await vector_indexes.search(project_id, query_embedding, k)
+        transactions = (
+            await Transaction.find(
+                Transaction.organization_id == organization_id,
+                Transaction.project_id == project_id,
+                In(Transaction.id, [id for id, _ in matches]),
+            )
+            .project(TransactionView)
+            .to_list()
+        )
+        transactions_by_id = {
+            transaction.id: transaction for transaction in transactions
+        }
+        return [
+            (transactions_by_id[id], score)
+            for id, score in matches
+            if id in transactions_by_id
+        ]
+
     async def create_transaction(
         self,
         statement_id: PydanticObjectId,
         project_id: PydanticObjectId,
+        organization_id: str,
         data: TransactionCreate,
     ) -> Transaction:
         statement = await self.get_by_id(
-            statement_id=statement_id, project_id=project_id
-        )
-        transaction_embedding_prompt = ChatPromptTemplate.from_template(
-            TRANSACTION_EMBEDDING_PROMPT
-        )
-        transaction_embedding_chain = (
-            transaction_embedding_prompt
-            | transaction_embedding_model
-            | PydanticOutputParser(pydantic_object=TransactionEmbedding)
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
         )
-
-        tx_type_raw = data.transaction_type
-        if isinstance(tx_type_raw, TransactionType):
-            is_expense = tx_type_raw == TransactionType.EXPENSE
-        else:
-            tx_str = str(tx_type_raw).lower()
-            is_expense = tx_str in ("expense", "transactiontype.expense")
-        tx_type_es = "gasto" if is_expense else "ingreso"
-
-        transaction_description = await transaction_embedding_chain.ainvoke(
-            {
-                "tx_type": tx_type_es,
-                "amount": data.transaction_value,
-                "description": data.description,
-            }
-        )
-        embedding = embeddings.embed_query(transaction_description.description)
+        [embedding] = await self._embed_transactions([data])
         new_transaction = Transaction(
             statement=statement,
+            organization_id=organization_id,
+            project_id=project_id,
             **data.model_dump(),
+            search_tokens=search_tokens(data.description),
             embedding=embedding,
         )
         await new_transaction.create()
+        await listing_count_cache.invalidate(project_id)
+        await vector_indexes.add(
+            project_id,
+            [new_transaction.id],
+            [decode_embedding(new_transaction.embedding)],
+        )
         return new_transaction
 
     async def update_transaction(
         self,
         transaction_id: PydanticObjectId,
+        statement_id: PydanticObjectId,
         project_id: PydanticObjectId,
+        organization_id: str,
         data: dict,
-    ) -> Transaction:
-        transaction = await self.get_transaction_by_id(
-            transaction_id=transaction_id, project_id=project_id
-        )
+    ) -> TransactionView:
         update_data = {getattr(Transaction, k): v for k, v in data.items()}
         update_data[Transaction.updated_at] = datetime.now(timezone.utc)
-        await Transaction.find_one(Transaction.id == transaction.id).set(update_data)
-        return await self.get_transaction_by_id(
-            transaction_id=transaction_id, project_id=project_id
+        if "description" in data:
+            update_data[Transaction.search_tokens] = search_tokens(data["description"])
+        if data.keys() & {"description", "transaction_type"}:
+            transaction = await self.get_transaction_by_id(
+                transaction_id=transaction_id,
+                statement_id=statement_id,
+                project_id=project_id,
+                organization_id=organization_id,
+            )
+            [embedding] = await self._embed_transactions(
+                [
+                    TransactionCreate(
+                        **{
+                            **transaction.model_dump(
+                                include=set(TransactionCreate.model_fields)
+                            ),
+                            **data,
+                        }
+                    )
+                ]
+            )
+            update_data[Transaction.embedding] = encode_embedding(embedding)
+        result = await Transaction.find_one(
+            self._transaction_filter(
+                transaction_id, statement_id, project_id, organization_id
+            )
+        ).update({"$set": update_data})
+        if not result.matched_count:
+            raise TransactionNotFoundException
+        transaction = await self.get_transaction_by_id(
+            transaction_id=transaction_id,
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
         )
+        if "description" in data:
+            await listing_count_cache.invalidate(project_id)
+        if Transaction.embedding in update_data:
+            await vector_indexes.add(
+                project_id,
+                [transaction.id],
+                [decode_embedding(update_data[Transaction.embedding])],
+            )
+        return transaction
 
     async def delete_transaction(
         self,
         transaction_id: PydanticObjectId,
+        statement_id: PydanticObjectId,
         project_id: PydanticObjectId,
+        organization_id: str,
     ) -> None:
-        transaction = await self.get_transaction_by_id(
-            transaction_id=transaction_id, project_id=project_id
-        )
-        await transaction.delete()
+        result = await Transaction.find_one(
+            self._transaction_filter(
+                transaction_id, statement_id, project_id, organization_id
+            )
+        ).delete()
+        if not result or not result.deleted_count:
+            raise TransactionNotFoundException
+        await listing_count_cache.invalidate(project_id)
+        await vector_indexes.remove(project_id, [transaction_id])
 
     async def update(
         self,
         id: PydanticObjectId,
         project_id: PydanticObjectId,
+        organization_id: str,
         statement_update: StatementUpdate,
+        processing_token: Optional[int] = None,
     ) -> Statement:
         update_values = statement_update.model_dump(exclude_none=True)
         update_data = {
             getattr(Statement, key): value for key, value in update_values.items()
         }
         update_data[Statement.updated_at] = datetime.now(timezone.utc)
+        if "name" in update_values:
+            update_data[Statement.search_tokens] = search_tokens(update_values["name"])
 
-        await Statement.find_one(
-            And(
-                Statement.id == id,
-                Statement.project.id == project_id,
-            )
-        ).set(update_data)
+        conditions = [
+            Statement.organization_id == organization_id,
+            Statement.project_id == project_id,
+            Statement.id == id,
+        ]
+        if processing_token is not None:
+            conditions.append(Statement.processing_token == processing_token)
+        statement = await Statement.find_one(And(*conditions)).set(
+            update_data, response_type=UpdateResponse.NEW_DOCUMENT
+        )
+        if not statement and processing_token is not None:
+            raise StaleProcessingTokenException
+        if not statement:
+            raise StatementNotFoundException
+        if update_values.keys() & {"name", "status"}:
+            await listing_count_cache.invalidate(project_id)
+        return statement
 
-        return await self.get_by_id(statement_id=id, project_id=project_id)
+    async def mark_failed(
+        self,
+        id: PydanticObjectId,
+        project_id: PydanticObjectId,
+        organization_id: str,
+        error: str,
+    ) -> Statement:
+        statement = await self.update(
+            id=id,
+            project_id=project_id,
+            organization_id=organization_id,
+            statement_update=StatementUpdate(status=StatementStatus.FAILED),
+        )
+        await status_broadcaster.publish(
+            str(id),
+            str(project_id),
+            {"status": StatementStatus.FAILED.value, "error": error},
+        )
+        return statement
 
-    async def send_statement_to_queue(
+    async def send_statements_to_queue(
         self,
-        statement: Statement,
+        statements: List[Statement],
         request: Request,
         project_id: str,
         organization_id: str,
         user_id: str,
+        priority: JobPriority = JobPriority.INTERACTIVE,
     ) -> None:
+        if not statements:
+            return
+        if settings.statement_queue_backend == "redis":
+            await job_queue.enqueue_many(
+                [
+                    (
+                        PROCESS_STATEMENT_JOB,
+                        {
+                            "statement_id": str(statement.id),
+                            "project_id": str(project_id),
+                            "organization_id": organization_id,
+                            "user_id": user_id,
+                        },
+                    )
+                    for statement in statements
+                ],
+                tenant=organization_id,
+                priority=priority,
+            )
+            return
         host = request.headers.get("host")
-        url = f"{'http' if host.startswith('localhost') else 'https'}://{host}/projects/{project_id}/statements/{statement.id}"
-        await qstash.message.publish_json(
-            url=url,
-            method="POST",
-            body={},
-            headers={
-                "Content-Type": "application/json",
-                "X-Api-Key": settings.api_key,
-                "X-Organization-Id": organization_id,
-            },
-            flow_control=FlowControl(parallelism=3, key=user_id),
+        base_url = f"{'http' if host.startswith('localhost') else 'https'}://{host}/projects/{project_id}/statements"
+        await qstash.message.batch_json(
+            [
+                {
+                    "url": f"{base_url}/{statement.id}",
+                    "method": "POST",
+                    "body": {},
+                    "headers": {
+                        "Content-Type": "application/json",
+                        "X-Api-Key": settings.api_key,
+                        "X-Organization-Id": organization_id,
+                    },
+                    "flow_control": FlowControl(parallelism=3, key=user_id),
+                }
+                for statement in statements
+            ]
         )
 
-    async def status_event(self, statement_id: str, request: Request):
-        key = f"statement_processing:{statement_id}"
+    async def status_event(
+        self,
+        statement_id: str,
+        request: Request,
+        last_event_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        events = status_broadcaster.subscribe(
+            status_broadcaster.statement_key(str(statement_id)),
+            last_event_id=last_event_id,
+            timeout=settings.status_heartbeat_seconds,
+        )
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                event_id, data = event
+                yield f"id: {event_id}\nevent: status\ndata: {json.dumps(data)}\n\n"
+        finally:
+            await events.aclose()
 
-        while not await request.is_disconnected():
-            try:
-                data = await redis.blpop(
-                    key,
-                )
-                if data:
-                    _, message = data
-                    yield json.loads(message)
-                await asyncio.sleep(1)
-            except asyncio.CancelledError:
-                break
+    async def project_status_event(
+        self,
+        project_id: PydanticObjectId,
+        request: Request,
+        last_event_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        window = settings.status_coalesce_ms / 1000
+        events = status_broadcaster.subscribe(
+            status_broadcaster.project_key(str(project_id)),
+            last_event_id=last_event_id,
+            timeout=window,
+        )
+        loop = asyncio.get_running_loop()
+        pending: Dict[str, tuple[str, dict]] = {}
+        flush_at: Optional[float] = None
+        idle_since = loop.time()
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                now = loop.time()
+                if event is not None:
+                    statement_id = event[1].get("statement_id")
+                    pending.pop(statement_id, None)
+                    pending[statement_id] = event
+                    flush_at = flush_at or now + window
+                if pending and now >= flush_at:
+                    for event_id, data in sorted(
+                        pending.values(), key=lambda entry: parse_stream_id(entry[0])
+                    ):
+                        yield f"id: {event_id}\nevent: status\ndata: {json.dumps(data)}\n\n"
+                    pending.clear()
+                    flush_at = None
+                    idle_since = now
+                elif (
+                    not pending
+                    and now - idle_since >= settings.status_heartbeat_seconds
+                ):
+                    yield ": ping\n\n"
+                    idle_since = now
+        finally:
+            await events.aclose()
 
     async def delete(
         self,
         statement_id: PydanticObjectId,
         project_id: PydanticObjectId,
+        organization_id: str,
     ) -> None:
         statement = await self.get_by_id(
-            statement_id=statement_id, project_id=project_id
+            statement_id=statement_id,
+            project_id=project_id,
+            organization_id=organization_id,
+        )
+        await self._delete_in_batches(
+            Transaction,
+            {
+                "project_id": project_id,
+                "organization_id": organization_id,
+                "statement.$id": statement.id,
+            },
         )
-        await Transaction.find(Transaction.statement.id == statement.id).delete()
         await statement.delete()
+        await listing_count_cache.invalidate(project_id)
+        await vector_indexes.invalidate(project_id)
+
+    async def _delete_in_batches(
+        self,
+        document: Type[Document],
+        filter: dict,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> int:
+        collection = document.get_pymongo_collection()
+        deleted = 0
+        while ids := [
+            item["_id"]
+            async for item in collection.find(filter, {"_id": 1}).limit(
+                settings.cascade_delete_batch_size
+            )
+        ]:
+            result = await collection.delete_many({"_id": {"$in": ids}})
+            deleted += result.deleted_count
+            if on_progress is not None:
+                await on_progress(result.deleted_count)
+            await asyncio.sleep(settings.cascade_delete_pause_seconds)
+        return deleted
 
     async def delete_all(
         self,
         project_id: PydanticObjectId,
+        organization_id: str,
+        on_progress: Optional[Callable[[str, int], Awaitable[None]]] = None,
     ) -> None:
-        await Transaction.find(Transaction.statement.project.id == project_id).delete()
-        await Statement.find(Statement.project.id == project_id).delete()
+        tenant = {"project_id": project_id, "organization_id": organization_id}
+        for field, document in (
+            ("statements", Statement),
+            ("transactions", Transaction),
+        ):
+
+            async def report(deleted: int, field: str = field) -> None:
+                if on_progress is not None:
+                    await on_progress(field, deleted)
+
+            await self._delete_in_batches(document, tenant, report)
+            await listing_count_cache.invalidate(project_id)
+        await vector_indexes.invalidate(project_id)
@@ -0,0 +1,45 @@
+import re
+import unicodedata
+from typing import List, Tuple
+
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+REFERENCE_NUMBER_PATTERN = re.compile(r"\d{4,}")
+
+
+def normalize_text(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return WHITESPACE_PATTERN.sub(" ", stripped.casefold()).strip()
+
+
+def normalize_description(value: str) -> str:
+    return REFERENCE_NUMBER_PATTERN.sub("#", normalize_text(value))
+
+
+SEARCH_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+SEARCH_PREFIX_MAX_LENGTH = 12
+SEARCH_EXACT_MARKER = "="
+
+
+def search_words(value: str) -> List[str]:
+    return list(dict.fromkeys(SEARCH_TOKEN_PATTERN.findall(normalize_text(value))))
+
+
+def search_tokens(value: str) -> List[str]:
+    tokens = set()
+    for word in search_words(value):
+        tokens.update(
+            word[:length]
+            for length in range(1, min(len(word), SEARCH_PREFIX_MAX_LENGTH) + 1)
+        )
+        tokens.add(f"{SEARCH_EXACT_MARKER}{word}")
+    return sorted(tokens)
+
+
+def search_query(value: str) -> Tuple[List[str], List[str]]:
+    words = search_words(value)
+    prefixes = sorted(
+        {word[:SEARCH_PREFIX_MAX_LENGTH] for word in words}, key=len, reverse=True
+    )
+    return prefixes, [f"{SEARCH_EXACT_MARKER}{word}" for word in words]
@@ -0,0 +1,307 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from beanie import PydanticObjectId
+from db import redis
+from settings import settings
+from modules.statements.cache import LRUCache
+from modules.statements.models import Transaction
+from modules.statements.vectors import decode_embedding
+
+
+PUBLISH_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+redis.call(
+    'XADD', KEYS[2], 'MAXLEN', '~', ARGV[1], '*',
+    'version', version, 'op', ARGV[2], 'ids', ARGV[3]
+)
+return version
+"""
+
+
+class VectorIndex:
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+        self.ids: List[PydanticObjectId] = []
+        self.positions: Dict[PydanticObjectId, int] = {}
+        self.vectors = np.empty((0, dimension), dtype=np.float32)
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self.trained_size = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        centroids = 0 if self.centroids is None else self.centroids.nbytes
+        return self.vectors.nbytes + self.assignments.nbytes + centroids
+
+    @property
+    def approximate(self) -> bool:
+        return len(self) >= settings.vector_index_exact_threshold
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, size: int) -> None:
+        if size <= self.vectors.shape[0]:
+            return
+        capacity = max(size, self.vectors.shape[0] * 2, 64)
+        vectors = np.empty((capacity, self.dimension), dtype=np.float32)
+        vectors[: len(self)] = self.vectors[: len(self)]
+        assignments = np.zeros(capacity, dtype=np.int32)
+        assignments[: len(self)] = self.assignments[: len(self)]
+        self.vectors = vectors
+        self.assignments = assignments
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _train(self) -> None:
+        size = len(self)
+        lists = max(1, int(np.sqrt(size)))
+        rng = np.random.default_rng(0)
+        data = self.vectors[:size]
+        sample = data[rng.choice(size, min(size, lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), lists, replace=False)]
+        for _ in range(settings.vector_index_train_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(lists):
+                members = sample[labels == list_id]
+                if len(members):
+                    centroids[list_id] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+        self.centroids = centroids
+        self.assignments[:size] = self._assign(data)
+        self.trained_size = size
+
+    def add(
+        self, ids: Sequence[PydanticObjectId], vectors: Sequence[Sequence[float]]
+    ) -> None:
+        with self.lock:
+            self._add(ids, vectors)
+
+    def _add(
+        self, ids: Sequence[PydanticObjectId], vectors: Sequence[Sequence[float]]
+    ) -> None:
+        self._remove([id for id in ids if id in self.positions])
+        if not ids:
+            return
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+        start = len(self)
+        self._reserve(start + len(ids))
+        self.vectors[start : start + len(ids)] = matrix
+        for offset, id in enumerate(ids):
+            self.positions[id] = start + offset
+            self.ids.append(id)
+        if not self.approximate:
+            return
+        if self.centroids is None or len(self) >= self.trained_size * 2:
+            self._train()
+        else:
+            self.assignments[start : len(self)] = self._assign(matrix)
+
+    def remove(self, ids: Sequence[PydanticObjectId]) -> None:
+        with self.lock:
+            self._remove(ids)
+
+    def _remove(self, ids: Sequence[PydanticObjectId]) -> None:
+        for id in ids:
+            position = self.positions.pop(id, None)
+            if position is None:
+                continue
+            last = len(self) - 1
+            if position != last:
+                moved = self.ids[last]
+                self.ids[position] = moved
+                self.vectors[position] = self.vectors[last]
+                self.assignments[position] = self.assignments[last]
+                self.positions[moved] = position
+            self.ids.pop()
+
+    def search(
+        self, query: Sequence[float], k: int
+    ) -> List[Tuple[PydanticObjectId, float]]:
+        with self.lock:
+            return self._search(query, k)
+
+    def _search(
+        self, query: Sequence[float], k: int
+    ) -> List[Tuple[PydanticObjectId, float]]:
+        size = len(self)
+        if not size:
+            return []
+        vector = self._normalize(
+            np.asarray([query], dtype=np.float32)[:, : self.dimension]
+        )[0]
+        candidates = np.arange(size)
+        if self.approximate and self.centroids is not None:
+            probes = np.argsort(self.centroids @ vector)[
+                -settings.vector_index_nprobe :
+            ]
+            candidates = candidates[np.isin(self.assignments[:size], probes)]
+        scores = self.vectors[candidates] @ vector
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.empty(0, dtype=int)
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in top]
+
+
+class ProjectVectorIndexes:
+    prefix = "vector_index"
+
+    def __init__(self) -> None:
+        self.indexes: LRUCache[PydanticObjectId, Tuple[VectorIndex, int]] = LRUCache(
+            settings.vector_index_max_bytes, weigh=lambda entry: entry[0].nbytes
+        )
+        self.locks: Dict[PydanticObjectId, asyncio.Lock] = {}
+        self.publish_script = redis.register_script(PUBLISH_SCRIPT)
+
+    def _version_key(self, project_id: PydanticObjectId) -> str:
+        return f"{self.prefix}:{project_id}:version"
+
+    def _changes_key(self, project_id: PydanticObjectId) -> str:
+        return f"{self.prefix}:{project_id}:changes"
+
+    def _lock(self, project_id: PydanticObjectId) -> asyncio.Lock:
+        return self.locks.setdefault(project_id, asyncio.Lock())
+
+    async def _version(self, project_id: PydanticObjectId) -> int:
+        return int(await redis.get(self._version_key(project_id)) or 0)
+
+    async def _publish(
+        self, project_id: PydanticObjectId, op: str, ids: Sequence[PydanticObjectId]
+    ) -> int:
+        return int(
+            await self.publish_script(
+                keys=[self._version_key(project_id), self._changes_key(project_id)],
+                args=[
+                    settings.vector_index_changes_maxlen,
+                    op,
+                    ",".join(str(id) for id in ids),
+                ],
+            )
+        )
+
+    async def _changes(
+        self, project_id: PydanticObjectId, after: int, until: int
+    ) -> Optional[List[Tuple[str, List[PydanticObjectId]]]]:
+        changes = []
+        for _, fields in await redis.xrange(self._changes_key(project_id)):
+            version = int(fields["version"])
+            if version <= after or version > until:
+                continue
+            if version != after + len(changes) + 1:
+                return None
+            ids = [PydanticObjectId(id) for id in fields["ids"].split(",") if id]
+            changes.append((fields["op"], ids))
+        return changes if after + len(changes) == until else None
+
+    async def _documents(self, filter: Dict[str, Any]) -> List[Tuple[Any, Any]]:
+        cursor = Transaction.get_pymongo_collection().find(filter, {"embedding": 1})
+        return [
+            (document["_id"], document["embedding"])
+            async for document in cursor
+            if document.get("embedding")
+        ]
+
+    def _decode(
+        self, documents: List[Tuple[Any, Any]]
+    ) -> Tuple[List[PydanticObjectId], List[np.ndarray]]:
+        return (
+            [PydanticObjectId(id) for id, _ in documents],
+            [decode_embedding(embedding) for _, embedding in documents],
+        )
+
+    def _load(self, documents: List[Tuple[Any, Any]]) -> VectorIndex:
+        ids, vectors = self._decode(documents)
+        index = VectorIndex(
+            dimension=len(vectors[0])
+            if vectors
+            else settings.embedding_storage_dimensions or settings.embedding_dimensions
+        )
+        index.add(ids, vectors)
+        return index
+
+    def _apply(self, index: VectorIndex, documents: List[Tuple[Any, Any]]) -> None:
+        index.add(*self._decode(documents))
+
+    async def _build(self, project_id: PydanticObjectId) -> VectorIndex:
+        documents = await self._documents({"project_id": project_id})
+        return await asyncio.to_thread(self._load, documents)
+
+    async def _catch_up(
+        self, project_id: PydanticObjectId, index: VectorIndex, after: int, until: int
+    ) -> bool:
+        changes = await self._changes(project_id, after, until)
+        if changes is None:
+            return False
+        for op, ids in changes:
+            if op == "remove":
+                await asyncio.to_thread(index.remove, ids)
+                continue
+            documents = await self._documents(
+                {"_id": {"$in": ids}, "project_id": project_id}
+            )
+            await asyncio.to_thread(self._apply, index, documents)
+        return True
+
+    async def get(self, project_id: PydanticObjectId) -> VectorIndex:
+        async with self._lock(project_id):
+            version = await self._version(project_id)
+            cached = self.indexes.get(project_id)
+            if cached is not None:
+                index, local_version = cached
+                if local_version == version:
+                    return index
+                if local_version < version and await self._catch_up(
+                    project_id, index, local_version, version
+                ):
+                    self.indexes.set(project_id, (index, version))
+                    return index
+            index = await self._build(project_id)
+            self.indexes.set(project_id, (index, version))
+            return index
+
+    async def add(
+        self,
+        project_id: PydanticObjectId,
+        ids: Sequence[PydanticObjectId],
+        vectors: Sequence[Sequence[float]],
+    ) -> None:
+        async with self._lock(project_id):
+            version = await self._publish(project_id, "add", ids)
+            cached = self.indexes.entries.get(project_id)
+            if cached is None or cached[1] != version - 1:
+                return
+            await asyncio.to_thread(cached[0].add, ids, vectors)
+            self.indexes.set(project_id, (cached[0], version))
+
+    async def remove(
+        self, project_id: PydanticObjectId, ids: Sequence[PydanticObjectId]
+    ) -> None:
+        async with self._lock(project_id):
+            version = await self._publish(project_id, "remove", ids)
+            cached = self.indexes.entries.get(project_id)
+            if cached is None or cached[1] != version - 1:
+                return
+            await asyncio.to_thread(cached[0].remove, ids)
+            self.indexes.set(project_id, (cached[0], version))
+
+    async def invalidate(self, project_id: PydanticObjectId) -> None:
+        await redis.incr(self._version_key(project_id))
+        self.indexes.evict(project_id)
+
+    async def search(
+        self, project_id: PydanticObjectId, query: Sequence[float], k: int
+    ) -> List[Tuple[PydanticObjectId, float]]:
+        index = await self.get(project_id)
+        return await asyncio.to_thread(index.search, query, k)
+
+
+vector_indexes = ProjectVectorIndexes()
@@ -0,0 +1,81 @@
+from typing import Annotated, Any, List, Optional, Sequence
+import numpy as np
+from bson.binary import VECTOR_SUBTYPE, Binary, BinaryVectorDtype
+from pydantic import PlainSerializer, PlainValidator
+from settings import settings
+
+
+VECTOR_HEADER_SIZE = 2
+
+VECTOR_DTYPES = {
+    "float32": BinaryVectorDtype.FLOAT32,
+    "int8": BinaryVectorDtype.INT8,
+    "bit": BinaryVectorDtype.PACKED_BIT,
+}
+
+
+def _truncate(vector: np.ndarray, dimensions: Optional[int]) -> np.ndarray:
+    if dimensions is None or dimensions >= vector.shape[0]:
+        return vector
+    vector = vector[:dimensions]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def encode_embedding(
+    embedding: Sequence[float],
+    encoding: Optional[str] = None,
+    dimensions: Optional[int] = None,
+) -> Binary:
+    encoding = encoding or settings.embedding_storage_encoding
+    dimensions = dimensions or settings.embedding_storage_dimensions
+    vector = _truncate(np.asarray(embedding, dtype=np.float32), dimensions)
+    dtype = VECTOR_DTYPES[encoding]
+    if dtype == BinaryVectorDtype.INT8:
+        scale = np.abs(vector).max()
+        vector = np.round(vector / scale * 127) if scale else vector
+        payload = vector.astype(np.int8).tobytes()
+        padding = 0
+    elif dtype == BinaryVectorDtype.PACKED_BIT:
+        payload = np.packbits(vector > 0).tobytes()
+        padding = -vector.shape[0] % 8
+    else:
+        payload = vector.astype("<f4").tobytes()
+        padding = 0
+    return Binary(dtype.value + bytes([padding]) + payload, subtype=VECTOR_SUBTYPE)
+
+
+def decode_embedding(value: Any, dimensions: Optional[int] = None) -> np.ndarray:
+    dimensions = dimensions or settings.embedding_storage_dimensions
+    if not isinstance(value, Binary) or value.subtype != VECTOR_SUBTYPE:
+        return _truncate(np.asarray(value, dtype=np.float32), dimensions)
+    dtype, padding = value[:1], value[1]
+    if dtype == BinaryVectorDtype.INT8.value:
+        vector = np.frombuffer(value, dtype=np.int8, offset=VECTOR_HEADER_SIZE)
+    elif dtype == BinaryVectorDtype.PACKED_BIT.value:
+        bits = np.unpackbits(
+            np.frombuffer(value, dtype=np.uint8, offset=VECTOR_HEADER_SIZE)
+        )
+        vector = bits[: bits.shape[0] - padding].astype(np.float32) * 2 - 1
+    else:
+        vector = np.frombuffer(value, dtype="<f4", offset=VECTOR_HEADER_SIZE)
+    return _truncate(vector, dimensions)
+
+
+def validate_embedding(value: Any) -> Binary:
+    if isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE:
+        return value
+    return encode_embedding(value)
+
+
+def pack_embedding(value: Any) -> np.ndarray:
+    return np.asarray(value, dtype=np.float32)
+
+
+StoredEmbedding = Annotated[Any, PlainValidator(validate_embedding)]
+
+PackedEmbedding = Annotated[
+    Any,
+    PlainValidator(pack_embedding),
+    PlainSerializer(lambda vector: vector.tolist(), return_type=List[float]),
+]
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from modules.projects.controllers import projects_router
-from modules.statements.controllers import statements_router
+from modules.statements.controllers import statements_router, transactions_router
+from modules.metrics.controllers import metrics_router
 from dependencies import get_api_key
 
 router = APIRouter(dependencies=[Depends(get_api_key)])
@@ -8,3 +9,5 @@ router = APIRouter(dependencies=[Depends(get_api_key)])
 
 router.include_router(projects_router, tags=["Projects"])
 router.include_router(statements_router, tags=["Statements"])
+router.include_router(transactions_router, tags=["Transactions"])
+router.include_router(metrics_router, tags=["Metrics"])
@@ -0,0 +1,116 @@
+import argparse
+import time
+from typing import List, Optional, Tuple
+import bson
+import numpy as np
+from modules.statements.vectors import decode_embedding, encode_embedding
+
+
+CONFIGURATIONS: List[Tuple[str, Optional[int]]] = [
+    ("float32", None),
+    ("int8", None),
+    ("bit", None),
+    ("float32", 512),
+    ("int8", 512),
+    ("float32", 256),
+    ("int8", 256),
+]
+
+
+def synthetic_vectors(
+    count: int, dimensions: int, clusters: int, seed: int = 0
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions))
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + rng.normal(scale=0.6, size=(count, dimensions))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ matrix.T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def recall(expected: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(a) & set(b)) for a, b in zip(expected, found))
+    return hits / expected.size
+
+
+def measure(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    expected: np.ndarray,
+    k: int,
+    encoding: Optional[str],
+    dimensions: Optional[int],
+) -> Tuple[float, float, float, float]:
+    rows = vectors.tolist()
+    started = time.perf_counter()
+    if encoding is None:
+        stored = rows
+    else:
+        stored = [encode_embedding(row, encoding, dimensions) for row in rows]
+    encode_seconds = time.perf_counter() - started
+    size = np.mean([len(bson.encode({"embedding": value})) for value in stored])
+
+    started = time.perf_counter()
+    decoded = np.vstack([decode_embedding(value, dimensions) for value in stored])
+    decode_seconds = time.perf_counter() - started
+
+    found = top_k(decoded.astype(np.float32), queries[:, : decoded.shape[1]], k)
+    return (
+        size,
+        encode_seconds / len(rows) * 1e6,
+        decode_seconds / len(rows) * 1e6,
+        recall(expected, found),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare embedding storage size, codec cost and recall@k."
+    )
+    parser.add_argument("--vectors", help="Path to a .npy matrix of real embeddings")
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float64)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = synthetic_vectors(args.count, args.dimensions, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + rng.normal(scale=0.02, size=queries.shape)
+    expected = top_k(vectors, queries, args.k)
+
+    print(
+        f"{len(vectors)} vectors x {vectors.shape[1]} dimensions, "
+        f"{args.queries} queries, recall@{args.k} against float64 exact search"
+    )
+    print(
+        f"{'storage':<16}{'bytes/doc':>12}{'encode us':>12}"
+        f"{'decode us':>12}{'recall':>10}"
+    )
+    for encoding, dimensions in [(None, None), *CONFIGURATIONS]:
+        label = "array<double>" if encoding is None else encoding
+        if dimensions:
+            label = f"{label}@{dimensions}"
+        size, encode_us, decode_us, score = measure(
+            vectors, queries, expected, args.k, encoding, dimensions
+        )
+        print(
+            f"{label:<16}{size:>12.0f}{encode_us:>12.1f}"
+            f"{decode_us:>12.1f}{score:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
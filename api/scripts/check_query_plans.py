@@ -0,0 +1,303 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, List, Tuple
+from beanie import PydanticObjectId, init_beanie
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+from pymongo.monitoring import CommandListener, CommandStartedEvent
+from settings import settings
+from modules.projects.models import Project
+from modules.projects.services import ProjectService
+from modules.statements.enums import StatementStatus
+from modules.statements.models import Statement, Transaction
+from modules.statements.schemas import StatementUpdate
+from modules.statements.services import StatementService
+from modules.statements.utils import search_tokens
+
+
+DATABASE_NAME = "moick_query_plans"
+ORGANIZATIONS = 2
+PROJECTS_PER_ORGANIZATION = 2
+STATEMENTS_PER_PROJECT = 20
+TRANSACTIONS_PER_STATEMENT = 50
+EXPLAINABLE_COMMANDS = {
+    "aggregate",
+    "count",
+    "delete",
+    "distinct",
+    "find",
+    "findAndModify",
+    "update",
+}
+SESSION_FIELDS = {
+    "$clusterTime",
+    "$db",
+    "$readPreference",
+    "apiDeprecationErrors",
+    "apiStrict",
+    "apiVersion",
+    "lsid",
+    "txnNumber",
+}
+BLOCKING_STAGES = {"COLLSCAN", "SORT", "$sort"}
+KNOWN_BLOCKING = {
+    "statements.list_paginated(search)": "ranked by search_score",
+    "statements.list_paginated(search, status)": "ranked by search_score",
+    "statements.list_transactions_paginated(search)": "ranked by search_score",
+}
+
+Statement.model_rebuild()
+Transaction.model_rebuild()
+Project.model_rebuild()
+
+
+class CommandRecorder(CommandListener):
+    def __init__(self) -> None:
+        self.label = ""
+        self.commands: List[Tuple[str, dict]] = []
+
+    def started(self, event: CommandStartedEvent) -> None:
+        if not self.label or event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        command = {
+            key: value
+            for key, value in event.command.items()
+            if key not in SESSION_FIELDS
+        }
+        self.commands.append((self.label, command))
+
+    def succeeded(self, event) -> None:
+        pass
+
+    def failed(self, event) -> None:
+        pass
+
+
+def plan_stages(plan: Any) -> Iterator[str]:
+    if isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+    elif isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            yield plan["stage"]
+        for key, value in plan.items():
+            if key != "rejectedPlans":
+                yield from plan_stages(value)
+
+
+def pipeline_stages(explain: Any) -> Iterator[str]:
+    if isinstance(explain, list):
+        for item in explain:
+            yield from pipeline_stages(item)
+    elif isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "stages" and isinstance(value, list):
+                for stage in value:
+                    if isinstance(stage, dict) and stage:
+                        yield next(iter(stage))
+            if key != "rejectedPlans":
+                yield from pipeline_stages(value)
+
+
+def winning_plans(explain: Any) -> Iterator[Any]:
+    if isinstance(explain, list):
+        for item in explain:
+            yield from winning_plans(item)
+    elif isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                yield value
+            else:
+                yield from winning_plans(value)
+
+
+async def seed(database) -> List[Tuple[str, ObjectId, ObjectId, ObjectId]]:
+    now = datetime.now(timezone.utc)
+    statuses = [status.value for status in StatementStatus]
+    targets = []
+    for organization in range(ORGANIZATIONS):
+        organization_id = f"org_{organization}"
+        for project in range(PROJECTS_PER_ORGANIZATION):
+            project_id = ObjectId()
+            await database.projects.insert_one(
+                {
+                    "_id": project_id,
+                    "name": f"Project {project}",
+                    "organization_id": organization_id,
+                    "color": "#000000",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+            statements = []
+            transactions = []
+            for index in range(STATEMENTS_PER_PROJECT):
+                statement_id = ObjectId()
+                statements.append(
+                    {
+                        "_id": statement_id,
+                        "name": f"statement-{index}.pdf",
+                        "search_tokens": search_tokens(f"statement-{index}.pdf"),
+                        "status": statuses[index % len(statuses)],
+                        "project": {"$ref": "projects", "$id": project_id},
+                        "organization_id": organization_id,
+                        "project_id": project_id,
+                        "created_at": now - timedelta(minutes=index),
+                        "updated_at": now,
+                    }
+                )
+                for position in range(TRANSACTIONS_PER_STATEMENT):
+                    transactions.append(
+                        {
+                            "_id": ObjectId(),
+                            "statement": {"$ref": "statements", "$id": statement_id},
+                            "organization_id": organization_id,
+                            "project_id": project_id,
+                            "transaction_value": float(position + 1),
+                            "description": f"Compra comercio {position}",
+                            "search_tokens": search_tokens(
+                                f"Compra comercio {position}"
+                            ),
+                            "date": now - timedelta(days=position),
+                            "transaction_type": "expense",
+                            "embedding": [0.0, 1.0],
+                            "created_at": now,
+                            "updated_at": now,
+                        }
+                    )
+            await database.statements.insert_many(statements)
+            await database.transactions.insert_many(transactions)
+            targets.append(
+                (
+                    organization_id,
+                    project_id,
+                    statements[0]["_id"],
+                    transactions[0]["_id"],
+                )
+            )
+    return targets
+
+
+async def exercise(recorder: CommandRecorder, targets) -> None:
+    statements = StatementService()
+    projects = ProjectService()
+    organization_id, project_id, statement_id, transaction_id = (
+        targets[0][0],
+        PydanticObjectId(targets[0][1]),
+        PydanticObjectId(targets[0][2]),
+        PydanticObjectId(targets[0][3]),
+    )
+
+    recorder.label = "projects.get_all"
+    await projects.get_all(organization_id=organization_id)
+    recorder.label = "projects.get_by_id"
+    await projects.get_by_id(id=project_id, organization_id=organization_id)
+    recorder.label = "statements.get_by_id"
+    await statements.get_by_id(statement_id, project_id, organization_id)
+    recorder.label = "statements.list_paginated"
+    _, _, cursor = await statements.list_paginated(
+        project_id, organization_id, offset=5
+    )
+    recorder.label = "statements.list_paginated(cursor)"
+    await statements.list_paginated(project_id, organization_id, cursor=cursor)
+    recorder.label = "statements.list_paginated(search)"
+    await statements.list_paginated(project_id, organization_id, search="statement 1")
+    recorder.label = "statements.list_paginated(status)"
+    await statements.list_paginated(
+        project_id, organization_id, status=StatementStatus.COMPLETED
+    )
+    recorder.label = "statements.list_paginated(search, status)"
+    await statements.list_paginated(
+        project_id,
+        organization_id,
+        search="statement 1",
+        status=StatementStatus.COMPLETED,
+    )
+    recorder.label = "statements.list_transactions_paginated"
+    _, _, cursor = await statements.list_transactions_paginated(
+        statement_id, project_id, organization_id, offset=10
+    )
+    recorder.label = "statements.list_transactions_paginated(cursor)"
+    await statements.list_transactions_paginated(
+        statement_id, project_id, organization_id, cursor=cursor
+    )
+    recorder.label = "statements.list_transactions_paginated(search)"
+    await statements.list_transactions_paginated(
+        statement_id, project_id, organization_id, search="comercio 1"
+    )
+    recorder.label = "statements.get_transaction_by_id"
+    await statements.get_transaction_by_id(
+        transaction_id, statement_id, project_id, organization_id
+    )
+    recorder.label = "statements.update_transaction"
+    await statements.update_transaction(
+        transaction_id,
+        statement_id,
+        project_id,
+        organization_id,
+        {"date": datetime.now(timezone.utc)},
+    )
+    recorder.label = "statements.update"
+    await statements.update(
+        statement_id,
+        project_id,
+        organization_id,
+        StatementUpdate(status=StatementStatus.COMPLETED),
+    )
+    recorder.label = "statements.delete_transaction"
+    await statements.delete_transaction(
+        transaction_id, statement_id, project_id, organization_id
+    )
+    recorder.label = "statements.delete"
+    await statements.delete(statement_id, project_id, organization_id)
+    recorder.label = "statements.delete_all"
+    await statements.delete_all(project_id, organization_id)
+    recorder.label = ""
+
+
+async def main() -> int:
+    recorder = CommandRecorder()
+    client = AsyncMongoClient(settings.mongo_uri, event_listeners=[recorder])
+    database = client[DATABASE_NAME]
+    await client.drop_database(DATABASE_NAME)
+    try:
+        await init_beanie(
+            database=database, document_models=[Project, Statement, Transaction]
+        )
+        await exercise(recorder, await seed(database))
+
+        failures = 0
+        known = 0
+        for label, command in recorder.commands:
+            explain = await database.command(
+                {"explain": command, "verbosity": "queryPlanner"}
+            )
+            stages = {
+                stage for plan in winning_plans(explain) for stage in plan_stages(plan)
+            } | set(pipeline_stages(explain))
+            blocking = sorted(stages & BLOCKING_STAGES)
+            name = next(iter(command))
+            if blocking and label in KNOWN_BLOCKING:
+                known += 1
+                print(
+                    f"known {label} [{name}]: {', '.join(blocking)}"
+                    f" ({KNOWN_BLOCKING[label]})"
+                )
+            elif blocking:
+                failures += 1
+                print(f"FAIL {label} [{name}]: {', '.join(blocking)}")
+            else:
+                print(f"ok   {label} [{name}]: {', '.join(sorted(stages))}")
+        print(
+            f"{len(recorder.commands)} queries checked, {failures} failed,"
+            f" {known} known blocking"
+        )
+        return 1 if failures else 0
+    finally:
+        await client.drop_database(DATABASE_NAME)
+        await client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,26 @@
+import argparse
+import asyncio
+from typing import List
+from modules.statements.cache import transaction_enrichment_cache
+from modules.statements.enums import TransactionType
+
+
+async def main(transaction_type: str, descriptions: List[str]) -> None:
+    keys = [
+        transaction_enrichment_cache.key(transaction_type, description)
+        for description in descriptions
+    ]
+    deleted = await transaction_enrichment_cache.invalidate(keys)
+    print(f"Invalidated {deleted} of {len(keys)} enrichment cache entries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drop cached enrichments for the given transaction descriptions"
+    )
+    parser.add_argument(
+        "transaction_type", choices=[value.value for value in TransactionType]
+    )
+    parser.add_argument("descriptions", nargs="+")
+    args = parser.parse_args()
+    asyncio.run(main(args.transaction_type, args.descriptions))
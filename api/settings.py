@@ -1,3 +1,4 @@
+from typing import Dict, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,16 +6,102 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env")
 
     mongo_uri: str
+    run_migrations_on_startup: bool = True
+    migration_lock_ttl_seconds: int = 60 * 60
     api_key: str
     storage_endpoint_url: str
     storage_access_key: str
     storage_secret_key: str
     bucket_name: str
+    storage_max_workers: int = 16
+    storage_upload_concurrency: int = 6
+    storage_multipart_chunk_size: int = 5 * 1024 * 1024
+    storage_multipart_concurrency: int = 4
+    storage_download_chunk_size: int = 1024 * 1024
     google_api_key: str
     redis_url: str
     redis_key_ttl_seconds: int
+    status_stream_maxlen: int = 100
+    project_status_stream_maxlen: int = 1000
+    status_coalesce_ms: int = 250
+    status_stream_block_ms: int = 1000
+    status_listener_queue_size: int = 256
+    status_heartbeat_seconds: int = 15
     qstash_token: str
     openai_api_key: str
+    transaction_enrichment_concurrency: int = 8
+    transaction_rewrite_batch_size: int = 50
+    transaction_rewrite_attempts: int = 2
+    embedding_batch_size: int = 256
+    statement_extraction_cache_ttl_seconds: int = 60 * 60 * 24 * 30
+    statement_extraction_cache_max_entries: int = 10_000
+    statement_chunk_pages: int = 4
+    statement_chunk_overlap_pages: int = 0
+    statement_chunk_concurrency: int = 4
+    statement_chunk_attempts: int = 3
+    statement_chunk_retry_backoff_seconds: float = 1.0
+    statement_text_min_chars_per_page: int = 200
+    transaction_enrichment_cache_size: int = 4096
+    transaction_enrichment_cache_ttl_seconds: int = 60 * 60 * 24 * 90
+    listing_count_cache_ttl_seconds: int = 60 * 5
+    embedding_dimensions: int = 1536
+    embedding_storage_encoding: Literal["float32", "int8", "bit"] = "float32"
+    embedding_storage_dimensions: Optional[int] = None
+    vector_index_exact_threshold: int = 20_000
+    vector_index_nprobe: int = 8
+    vector_index_train_iterations: int = 10
+    vector_index_max_bytes: int = 512 * 1024 * 1024
+    vector_index_changes_maxlen: int = 1000
+    llm_requests_per_minute: Dict[str, int] = {
+        "gemini-2.0-flash": 2_000,
+        "gpt-4o-mini": 5_000,
+        "text-embedding-3-small": 5_000,
+    }
+    llm_tokens_per_minute: Dict[str, int] = {
+        "gemini-2.0-flash": 4_000_000,
+        "gpt-4o-mini": 2_000_000,
+        "text-embedding-3-small": 5_000_000,
+    }
+    llm_rate_limit_burst_seconds: float = 10.0
+    llm_initial_concurrency: int = 8
+    llm_min_concurrency: int = 1
+    llm_max_concurrency: int = 64
+    llm_concurrency_decrease_factor: float = 0.5
+    llm_concurrency_decrease_cooldown_seconds: float = 2.0
+    llm_latency_spike_ratio: float = 2.0
+    llm_timeout_seconds: Dict[str, float] = {
+        "gemini-2.0-flash": 120.0,
+        "gpt-4o-mini": 60.0,
+        "text-embedding-3-small": 30.0,
+    }
+    llm_default_timeout_seconds: float = 60.0
+    llm_max_attempts: int = 4
+    llm_retry_base_seconds: float = 0.5
+    llm_retry_max_seconds: float = 20.0
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 50
+    llm_latency_window: int = 200
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_window_seconds: float = 30.0
+    llm_circuit_open_seconds: float = 30.0
+    storage_delete_batch_size: int = 1000
+    cascade_delete_batch_size: int = 1000
+    cascade_delete_pause_seconds: float = 0.05
+    cascade_delete_progress_ttl_seconds: int = 60 * 60 * 24
+    statement_lease_ttl_seconds: float = 60.0
+    statement_lease_wait_seconds: float = 30.0
+    statement_lease_poll_seconds: float = 0.5
+    statement_queue_backend: Literal["qstash", "redis"] = "qstash"
+    job_worker_concurrency: int = 4
+    job_global_concurrency: int = 16
+    job_visibility_timeout_seconds: int = 60 * 5
+    job_max_attempts: int = 3
+    job_tenant_weights: Dict[str, float] = {}
+    job_max_deferrals: int = 20
+    job_retry_backoff_seconds: float = 5.0
+    job_poll_interval_seconds: float = 1.0
+    job_shutdown_grace_seconds: int = 60
 
 
 settings = Settings()
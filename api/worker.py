@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import signal
+from beanie import init_beanie
+from db import db
+from modules.jobs.queue import job_queue
+from modules.jobs.worker import Worker
+from modules.projects.deletion import DELETE_PROJECT_JOB, handle_delete_project
+from modules.projects.models import Project
+from modules.statements.constant import PROCESS_STATEMENT_JOB
+from modules.statements.events import status_broadcaster
+from modules.statements.jobs import handle_process_statement
+from modules.statements.models import Statement, Transaction
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+Statement.model_rebuild()
+Transaction.model_rebuild()
+Project.model_rebuild()
+
+
+async def main() -> None:
+    await init_beanie(database=db, document_models=[Project, Statement, Transaction])
+    worker = Worker(
+        job_queue,
+        handlers={
+            PROCESS_STATEMENT_JOB: handle_process_statement,
+            DELETE_PROJECT_JOB: handle_delete_project,
+        },
+        concurrency=settings.job_worker_concurrency,
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    logger.info("Worker started with concurrency %d", settings.job_worker_concurrency)
+    try:
+        await worker.run()
+    finally:
+        await status_broadcaster.close()
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())